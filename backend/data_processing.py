@@ -692,7 +692,7 @@ def process_uploaded_image(image_path, layer_name="uploaded", out_dir="data", le
         # the EXACT same image (no scaling) and EXACT same transformation
         try:
             if use_tps:
-                from utils.tps import tps_transform_from_points, apply_tps_to_geometry
+                from utils.tps import tps_transform_from_points, apply_tps_to_gdf
             else:
                 from utils.homography import (
                     rect_bounds_to_corners,
@@ -701,7 +701,7 @@ def process_uploaded_image(image_path, layer_name="uploaded", out_dir="data", le
                 )
         except ImportError:
             if use_tps:
-                from backend.utils.tps import tps_transform_from_points, apply_tps_to_geometry
+                from backend.utils.tps import tps_transform_from_points, apply_tps_to_gdf
             else:
                 from backend.utils.homography import (
                     rect_bounds_to_corners,
@@ -776,12 +776,8 @@ def process_uploaded_image(image_path, layer_name="uploaded", out_dir="data", le
                 tps_dst_array = np.array(tps_dst_points, dtype=float)
                 tps_func = tps_transform_from_points(tps_src_array, tps_dst_array)
                 
-                # Apply TPS to all geometries
-                gdf_conus_px = shp_conus.copy()
-                gdf_conus_px["geometry"] = gdf_conus_px.geometry.apply(
-                    lambda geom: apply_tps_to_geometry(geom, tps_func)
-                )
-                gdf_conus_px.crs = None
+                # Apply TPS to all geometries in one batched evaluation
+                gdf_conus_px = apply_tps_to_gdf(shp_conus, tps_func)
                 print(f"  ✓ TPS transformation applied to all geometries")
             else:
                 # Compute homography matrix (EXACT same as interactive overlay)
@@ -1,25 +1,25 @@
+import os
+from functools import lru_cache
 from typing import Optional, Tuple, List
 
 import cv2
 import numpy as np
+import shapely
 import geopandas as gpd
 from shapely.affinity import scale, translate, rotate
 from shapely.geometry import Polygon, Point
 from PIL import Image, ImageDraw
 
 
-def fit_gdf_to_bbox_pixels(
-    gdf: gpd.GeoDataFrame,
+def _bbox_fit_params(
+    src_bounds: Tuple[float, float, float, float],
     bbox: Tuple[int, int, int, int],
-    polygon: Optional[List[Tuple[int, int]]] = None,
-    keep_aspect: bool = False,
-    inset_px: int = 6,  # shave panel frame/padding
-):
+    keep_aspect: bool,
+    inset_px: int,
+) -> Tuple[float, float, float, float]:
     """
-    Map geometries from shapefile coords into image pixel coords of the given bbox.
-    - Image pixel origin is top-left; Y grows downward => we flip Y.
-    - keep_aspect=False lets X and Y scale independently (better for projected prints).
-    - inset_px trims a tiny margin inside the bbox to avoid the panel's white/black frame.
+    Compute the (sx, sy, dx, dy) mapping src_bounds into bbox with Y flipped:
+    x' = x * sx + dx, y' = y * -sy + dy.
     """
     x0, y0, x1, y1 = bbox
     if inset_px > 0:
@@ -30,8 +30,7 @@ def fit_gdf_to_bbox_pixels(
     W = max(1, x1 - x0)
     H = max(1, y1 - y0)
 
-    # shapefile bounds in its native CRS
-    minx, miny, maxx, maxy = gdf.total_bounds
+    minx, miny, maxx, maxy = src_bounds
     w_src = max(maxx - minx, 1e-9)
     h_src = max(maxy - miny, 1e-9)
 
@@ -47,7 +46,7 @@ def fit_gdf_to_bbox_pixels(
 
     # Translation to fill bbox exactly (edge-to-edge, not centered)
     # When keep_aspect=False and inset_px=0, we want exact fill of the bbox
-    
+
     if keep_aspect:
         # Center when preserving aspect (may have padding)
         dx_final = x0 + (W - scaled_w) / 2.0 - (minx * sx)
@@ -62,46 +61,72 @@ def fit_gdf_to_bbox_pixels(
         # After Y-flip: maxy (north) becomes -maxy*sy, which should map to y0 (top)
         dy_final = y0 - (-maxy * sy)  # Simplify: y0 + (maxy * sy)
 
-    def _affine(geom):
-        g = scale(geom, xfact=sx, yfact=-sy, origin=(0, 0))  # flip Y
-        g = translate(g, xoff=dx_final, yoff=dy_final)
-        return g
+    return sx, sy, dx_final, dy_final
+
 
+def fit_gdf_to_bbox_pixels(
+    gdf: gpd.GeoDataFrame,
+    bbox: Tuple[int, int, int, int],
+    polygon: Optional[List[Tuple[int, int]]] = None,
+    keep_aspect: bool = False,
+    inset_px: int = 6,  # shave panel frame/padding
+):
+    """
+    Map geometries from shapefile coords into image pixel coords of the given bbox.
+    - Image pixel origin is top-left; Y grows downward => we flip Y.
+    - keep_aspect=False lets X and Y scale independently (better for projected prints).
+    - inset_px trims a tiny margin inside the bbox to avoid the panel's white/black frame.
+    """
+    sx, sy, dx_final, dy_final = _bbox_fit_params(gdf.total_bounds, bbox, keep_aspect, inset_px)
+
+    # One vectorized pass over every vertex (scale + Y-flip + translate)
+    # instead of a shapely.affinity call per geometry
+    geoms = gdf.geometry.values
+    coords = shapely.get_coordinates(geoms)
+    new_coords = np.empty_like(coords)
+    new_coords[:, 0] = coords[:, 0] * sx + dx_final
+    new_coords[:, 1] = coords[:, 1] * -sy + dy_final
     gdf_px = gdf.copy()
-    gdf_px.geometry = gdf_px.geometry.apply(_affine)
+    gdf_px.geometry = shapely.set_coordinates(geoms.copy(), new_coords)
 
     if polygon and len(polygon) >= 3:
         clip_poly = Polygon(polygon)
-        gdf_px.geometry = gdf_px.geometry.intersection(clip_poly)
+        gdf_px = _clip_to_polygon(gdf_px, clip_poly)
 
     return gdf_px
 
 
+def _clip_to_polygon(gdf_px: gpd.GeoDataFrame, clip_poly: Polygon) -> gpd.GeoDataFrame:
+    """
+    Clip geometries to clip_poly with an STRtree early-out: geometries wholly
+    inside the polygon are kept untouched (the common case for a panel rect),
+    only the ones crossing its boundary pay for a GEOS intersection, and
+    geometries outside are dropped.
+    """
+    geoms = np.asarray(gdf_px.geometry.values, dtype=object)
+    tree = shapely.STRtree(geoms)
+    touching = tree.query(clip_poly, predicate="intersects")
+    inside = tree.query(clip_poly, predicate="contains_properly")
+    boundary = np.setdiff1d(touching, inside)
+
+    new_geoms = geoms.copy()
+    if len(boundary) > 0:
+        new_geoms[boundary] = shapely.intersection(geoms[boundary], clip_poly)
+
+    keep = np.zeros(len(geoms), dtype=bool)
+    keep[touching] = True
+    out = gdf_px.loc[keep].copy()
+    out.geometry = new_geoms[keep]
+    return out
+
+
 def _extract_shapefile_edge_points(gdf_px: gpd.GeoDataFrame, n_points: int = None) -> np.ndarray:
     """Extract ALL edge points from shapefile geometries - no sampling unless specified."""
-    edge_points = []
-    for geom in gdf_px.geometry:
-        if geom is None or geom.is_empty:
-            continue
-        polygons = list(geom.geoms) if geom.geom_type == "MultiPolygon" else [geom]
-        for poly in polygons:
-            # Get all exterior coordinates
-            coords = list(poly.exterior.coords)
-            if len(coords) < 3:
-                continue
-            edge_points.extend(coords)
-            
-            # Also get interior boundaries (holes) if any
-            if hasattr(poly, 'interiors'):
-                for interior in poly.interiors:
-                    interior_coords = list(interior.coords)
-                    if len(interior_coords) >= 3:
-                        edge_points.extend(interior_coords)
-    
-    if not edge_points:
+    # Bulk-extract every vertex (exteriors AND interior rings) in one C call
+    # instead of walking each geometry's rings in Python
+    arr = shapely.get_coordinates(gdf_px.geometry.values)
+    if arr.size == 0:
         return np.array([])
-    
-    arr = np.array(edge_points)
     # Only sample if explicitly requested (for speed in refinement)
     if n_points and len(arr) > n_points:
         # Use uniform sampling along all edges, not random
@@ -110,13 +135,51 @@ def _extract_shapefile_edge_points(gdf_px: gpd.GeoDataFrame, n_points: int = Non
     return arr
 
 
-def _detect_image_edges(image_path: str, bbox: Tuple[int, int, int, int]) -> np.ndarray:
+def _apply_search_transform(
+    gdf: gpd.GeoDataFrame,
+    angle: float,
+    sx: float,
+    sy: float,
+    dx: float,
+    dy: float,
+    center_x: float,
+    center_y: float,
+) -> gpd.GeoDataFrame:
+    """
+    Apply the grid search's rotate -> scale -> translate (about the bbox center)
+    to every vertex of the GeoDataFrame in one vectorized pass.
+    """
+    out = gdf.copy()
+    geoms = out.geometry.values.copy()
+    coords = shapely.get_coordinates(geoms)
+    rel = coords - (center_x, center_y)
+    cos_a = np.cos(np.radians(angle))
+    sin_a = np.sin(np.radians(angle))
+    rotated = np.empty_like(rel)
+    rotated[:, 0] = rel[:, 0] * cos_a - rel[:, 1] * sin_a
+    rotated[:, 1] = rel[:, 0] * sin_a + rel[:, 1] * cos_a
+    new_coords = rotated * (sx, sy) + (center_x + dx, center_y + dy)
+    out.geometry = shapely.set_coordinates(geoms, new_coords)
+    return out
+
+
+def _detect_image_edges(
+    image_path: Optional[str],
+    bbox: Tuple[int, int, int, int],
+    image_array: Optional[np.ndarray] = None,
+) -> np.ndarray:
     """
     Detect ALL county/state boundary edges in the map image within the bbox.
     Optimized to capture thin dark lines that separate colored county regions.
     Uses multiple techniques to ensure we catch all visible boundaries.
+
+    Pass image_array (BGR, cv2 channel order) to skip the disk read when the
+    caller already holds the pixels in memory.
     """
-    img = cv2.imread(str(image_path))
+    if image_array is not None:
+        img = image_array
+    else:
+        img = cv2.imread(str(image_path))
     if img is None:
         return np.array([])
     
@@ -149,22 +212,21 @@ def _detect_image_edges(image_path: str, bbox: Tuple[int, int, int, int]) -> np.
     b_channel = lab[:, :, 2]  # Blue-Yellow axis
     
     # Detect gradients in all LAB channels (color changes are most visible here)
-    sobel_l_x = cv2.Sobel(l_channel, cv2.CV_64F, 1, 0, ksize=3)
-    sobel_l_y = cv2.Sobel(l_channel, cv2.CV_64F, 0, 1, ksize=3)
-    sobel_a_x = cv2.Sobel(a_channel, cv2.CV_64F, 1, 0, ksize=3)
-    sobel_a_y = cv2.Sobel(a_channel, cv2.CV_64F, 0, 1, ksize=3)
-    sobel_b_x = cv2.Sobel(b_channel, cv2.CV_64F, 1, 0, ksize=3)
-    sobel_b_y = cv2.Sobel(b_channel, cv2.CV_64F, 0, 1, ksize=3)
-    
+    # spatialGradient fuses the X/Y Sobel passes into one (CV_16S output),
+    # and the magnitude is computed in FP32 instead of FP64
+    sobel_l_x, sobel_l_y = cv2.spatialGradient(l_channel, ksize=3)
+    sobel_a_x, sobel_a_y = cv2.spatialGradient(a_channel, ksize=3)
+    sobel_b_x, sobel_b_y = cv2.spatialGradient(b_channel, ksize=3)
+
     # Combine gradients from all color channels
-    gradient_l = np.sqrt(sobel_l_x**2 + sobel_l_y**2)
-    gradient_a = np.sqrt(sobel_a_x**2 + sobel_a_y**2)
-    gradient_b = np.sqrt(sobel_b_x**2 + sobel_b_y**2)
+    gradient_l = cv2.magnitude(sobel_l_x.astype(np.float32), sobel_l_y.astype(np.float32))
+    gradient_a = cv2.magnitude(sobel_a_x.astype(np.float32), sobel_a_y.astype(np.float32))
+    gradient_b = cv2.magnitude(sobel_b_x.astype(np.float32), sobel_b_y.astype(np.float32))
     gradient_magnitude = gradient_l + gradient_a + gradient_b  # Sum all color gradients
-    
+
     # Normalize and threshold - use lower threshold to catch subtle color boundaries
     if gradient_magnitude.max() > 0:
-        gradient_norm = np.uint8(255 * gradient_magnitude / gradient_magnitude.max())
+        gradient_norm = cv2.normalize(gradient_magnitude, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
         # Use adaptive thresholding for better color boundary detection
         _, gradient_edges_high = cv2.threshold(gradient_norm, 20, 255, cv2.THRESH_BINARY)
         _, gradient_edges_low = cv2.threshold(gradient_norm, 10, 255, cv2.THRESH_BINARY)
@@ -174,10 +236,13 @@ def _detect_image_edges(image_path: str, bbox: Tuple[int, int, int, int]) -> np.
     
     # Also detect color boundaries directly in RGB space
     # Calculate color difference between adjacent pixels
-    b, g, r = cv2.split(cropped)
     color_diff_x = np.abs(np.diff(cropped.astype(np.int16), axis=1, prepend=cropped[:, 0:1, :]))
     color_diff_y = np.abs(np.diff(cropped.astype(np.int16), axis=0, prepend=cropped[0:1, :, :]))
-    color_boundary = np.sum(color_diff_x, axis=2) + np.sum(color_diff_y, axis=2)
+    # Accumulate in int32/float32 - the default int64/float64 temporaries
+    # double the memory traffic of this full-frame stage for no extra accuracy
+    color_boundary = (
+        color_diff_x.sum(axis=2, dtype=np.int32) + color_diff_y.sum(axis=2, dtype=np.int32)
+    ).astype(np.float32)
     color_boundary_norm = np.uint8(255 * np.clip(color_boundary / (color_boundary.max() + 1), 0, 1))
     _, color_boundary_edges = cv2.threshold(color_boundary_norm, 30, 255, cv2.THRESH_BINARY)
     gradient_edges = cv2.bitwise_or(gradient_edges, color_boundary_edges)
@@ -216,7 +281,13 @@ def _detect_image_edges(image_path: str, bbox: Tuple[int, int, int, int]) -> np.
     
     # Convert back to full-image coordinates
     edge_points = np.column_stack([x_coords + x0, y_coords + y0])
-    
+
+    # Thin to a 2-px grid: dilated edge lines contribute runs of adjacent
+    # pixels that add nothing to matching. Snapping to the grid and
+    # deduplicating cuts the point count ~4x while preserving the spatial
+    # distribution (unlike index subsampling)
+    edge_points = np.unique(edge_points.astype(np.int32) >> 1, axis=0) << 1
+
     # For comprehensive matching, keep all edge points up to a reasonable limit
     # Only sample if truly excessive
     if len(edge_points) > 20000:  # Increased limit for better coverage
@@ -229,23 +300,26 @@ def _detect_image_edges(image_path: str, bbox: Tuple[int, int, int, int]) -> np.
 
 def refine_alignment_with_edge_matching(
     gdf_px: gpd.GeoDataFrame,
-    image_path: str,
-    bbox: Tuple[int, int, int, int],
+    image_path: Optional[str] = None,
+    bbox: Tuple[int, int, int, int] = None,
     max_iterations: int = 5,
     is_alaska_hawaii: bool = False,
+    image_array: Optional[np.ndarray] = None,
 ) -> gpd.GeoDataFrame:
     """
     Iterative alignment: Rotate → Check alignment with edge detection → Repeat until perfect.
-    
+
     Algorithm:
     1. Try rotation angle
     2. Use edge detection to check if alignment is perfect
     3. If perfect → stop
     4. Otherwise → try next rotation angle
     5. Repeat until perfect alignment found or all angles tried
+
+    Accepts either image_path (read from disk) or image_array (BGR pixels
+    already in memory - avoids a PNG encode/decode round trip for callers
+    that crop from a loaded image).
     """
-    from scipy.spatial import cKDTree
-    from shapely.affinity import translate, rotate
     
     # Extract ALL shapefile edge points - no sampling for comprehensive matching
     shapefile_edges = _extract_shapefile_edge_points(gdf_px, n_points=None)
@@ -256,28 +330,115 @@ def refine_alignment_with_edge_matching(
     print(f"Extracted {len(shapefile_edges)} shapefile edge points")
     
     # Detect ALL image edges - comprehensive edge detection
-    image_edges = _detect_image_edges(image_path, bbox)
+    image_edges = _detect_image_edges(image_path, bbox, image_array=image_array)
     if len(image_edges) == 0:
         print("WARNING: No image edges detected!")
         return gdf_px
     
     print(f"Detected {len(image_edges)} image edge points (county borders from color changes)")
     
-    # Build KDTree for fast nearest neighbor search (much faster than cdist)
-    image_tree = cKDTree(image_edges)
+    # O(1) nearest-edge lookup: rasterize the edge points once and precompute a
+    # distance transform, so each query is a single array lookup instead of a
+    # KDTree descent. The pad exceeds every match tolerance used below, so any
+    # point falling outside the grid can never be a valid match.
+    pad = 128
+    edge_xy = image_edges.astype(np.int64)
+    ox = int(edge_xy[:, 0].min()) - pad
+    oy = int(edge_xy[:, 1].min()) - pad
+    gw = int(edge_xy[:, 0].max()) - ox + pad + 1
+    gh = int(edge_xy[:, 1].max()) - oy + pad + 1
+    edge_mask = np.full((gh, gw), 255, np.uint8)
+    edge_mask[edge_xy[:, 1] - oy, edge_xy[:, 0] - ox] = 0
+    dist_map = cv2.distanceTransform(edge_mask, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+
+    def _nearest_edge_distances(points: np.ndarray) -> np.ndarray:
+        """Distance from each point to the nearest detected image edge."""
+        xi = np.rint(points[:, 0]).astype(np.int64) - ox
+        yi = np.rint(points[:, 1]).astype(np.int64) - oy
+        inside = (xi >= 0) & (xi < gw) & (yi >= 0) & (yi < gh)
+        out = np.full(len(points), np.inf)
+        out[inside] = dist_map[yi[inside], xi[inside]]
+        return out
+
+    def _coarse_to_fine_search(rotated_rel, center, sx_bounds, sy_bounds,
+                               dx_bounds, dy_bounds, n_pts, tolerance,
+                               threshold, steps=3):
+        """
+        Multi-resolution sweep over (sx, sy, dx, dy): score a steps^4 grid,
+        halve every range around the best cell found so far and repeat until
+        the translation step drops below 0.25 px and the scale step below
+        0.25%. The score landscape is smooth, so this reaches the same
+        optimum as a dense uniform sweep at a fraction of the evaluations.
+
+        Returns (score, match_ratio, match_count, (sx, sy, dx, dy)) of the
+        best candidate, or None if no candidate met the match threshold.
+        """
+        nonlocal iteration_count
+        sx_lo, sx_hi = sx_bounds
+        sy_lo, sy_hi = sy_bounds
+        dx_lo, dx_hi = dx_bounds
+        dy_lo, dy_hi = dy_bounds
+        best = None
+        while True:
+            dx_vals = np.linspace(dx_lo, dx_hi, steps)
+            dy_vals = np.linspace(dy_lo, dy_hi, steps)
+            offsets = np.column_stack([
+                np.repeat(dx_vals, steps),
+                np.tile(dy_vals, steps),
+            ])
+            for sx in np.linspace(sx_lo, sx_hi, steps):
+                for sy in np.linspace(sy_lo, sy_hi, steps):
+                    iteration_count += len(offsets)
+                    scaled = rotated_rel * (sx, sy) + center
+                    batch = scaled[None, :, :] + offsets[:, None, :]
+                    distances = _nearest_edge_distances(batch.reshape(-1, 2))
+                    distances = distances.reshape(len(offsets), n_pts)
+
+                    valid = distances < tolerance
+                    counts = valid.sum(axis=1)
+                    eligible = counts > n_pts * threshold
+                    if not eligible.any():
+                        continue
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        scores = np.where(valid, distances, 0.0).sum(axis=1) / counts
+                    match_ratios = counts / n_pts
+                    combined = np.where(eligible, scores / (match_ratios + 0.1), np.inf)
+                    idx = int(np.argmin(combined))
+                    if best is None or combined[idx] < best[0]:
+                        dx, dy = offsets[idx]
+                        best = (float(combined[idx]), float(match_ratios[idx]),
+                                int(counts[idx]),
+                                (float(sx), float(sy), float(dx), float(dy)))
+
+            sx_step = (sx_hi - sx_lo) / (steps - 1)
+            sy_step = (sy_hi - sy_lo) / (steps - 1)
+            dx_step = (dx_hi - dx_lo) / (steps - 1)
+            dy_step = (dy_hi - dy_lo) / (steps - 1)
+            if best is None or (dx_step < 0.25 and dy_step < 0.25 and
+                                sx_step < 0.0025 and sy_step < 0.0025):
+                return best
+
+            # Halve the window around the best cell: the new range spans one
+            # old grid step, so the step size halves at each level
+            sx_c, sy_c, dx_c, dy_c = best[3]
+            sx_lo, sx_hi = sx_c - sx_step / 2, sx_c + sx_step / 2
+            sy_lo, sy_hi = sy_c - sy_step / 2, sy_c + sy_step / 2
+            dx_lo, dx_hi = dx_c - dx_step / 2, dx_c + dx_step / 2
+            dy_lo, dy_hi = dy_c - dy_step / 2, dy_c + dy_step / 2
     
     # For Alaska/Hawaii, also try matching with a denser sample of shapefile edges
     # This helps when the shapefile needs significant rotation
     
-    # Start with current alignment
-    base_gdf = gdf_px.copy()
-    best_gdf = base_gdf.copy()
+    # Start with current alignment. base_gdf is never mutated (every accepted
+    # transform materializes a fresh frame), so no defensive copies here
+    base_gdf = gdf_px
+    best_gdf = base_gdf
     best_score = float('inf')
     
     # Calculate baseline score (no rotation) to compare against
     base_sample = _extract_shapefile_edge_points(base_gdf, n_points=min(1000, len(shapefile_edges)))
     if len(base_sample) > 0:
-        base_distances, _ = image_tree.query(base_sample, k=1)
+        base_distances = _nearest_edge_distances(base_sample)
         base_valid = base_distances[base_distances < 30]
         if len(base_valid) > len(base_sample) * 0.05:
             base_score_val = np.mean(base_valid)
@@ -347,21 +508,37 @@ def refine_alignment_with_edge_matching(
     
     # ITERATIVE SEARCH: Try each rotation angle, check alignment, keep best
     best_score = float('inf')
-    best_gdf = base_gdf.copy()
+    best_gdf = base_gdf
     best_angle = 0.0
+    best_params = None  # (angle, sx, sy, dx, dy) of the best candidate
     
     print(f"\n  Iterating through {len(rotation_angles)} rotation angles...")
     print(f"  For each angle: Try rotation → Check alignment with edge detection → Keep if better")
     
-    total_iterations = len(rotation_angles) * len(sx_range) * len(sy_range) * len(dx_range) * len(dy_range)
-    print(f"  Total iterations: {total_iterations}")
-    
+    print(f"  Search: {len(rotation_angles)} angles x coarse-to-fine grid over (sx, sy, dx, dy)")
+
     iteration_count = 0
-    
+
+    n_sample = len(shapefile_sample)
+    match_tolerance = 50 if is_alaska_hawaii else 40
+    match_threshold = 0.01 if is_alaska_hawaii else 0.02
+    center = np.array([center_x, center_y])
+    sample_rel = shapefile_sample.astype(float) - center
+
+    # Precompute the whole rotation sweep: cos/sin tables plus every rotated
+    # sample as one (n_angles, N, 2) tensor, so the per-angle work inside the
+    # loop is a plain index
+    angle_rad = np.radians(rotation_angles)
+    cos_table = np.cos(angle_rad)
+    sin_table = np.sin(angle_rad)
+    rotated_all = np.empty((len(rotation_angles),) + sample_rel.shape)
+    rotated_all[:, :, 0] = np.outer(cos_table, sample_rel[:, 0]) - np.outer(sin_table, sample_rel[:, 1])
+    rotated_all[:, :, 1] = np.outer(sin_table, sample_rel[:, 0]) + np.outer(cos_table, sample_rel[:, 1])
+
     for angle_idx, angle in enumerate(rotation_angles):
         if early_exit:
             break
-        
+
         # Progress update - more frequent for Alaska/Hawaii since we're checking more angles
         if is_alaska_hawaii:
             if angle_idx % 30 == 0:  # Every 30 degrees for Alaska/Hawaii (finer search)
@@ -369,105 +546,63 @@ def refine_alignment_with_edge_matching(
         else:
             if angle_idx % 10 == 0:  # Every 10 angles for CONUS
                 print(f"    Testing rotation {angle:.1f}° ({angle_idx+1}/{len(rotation_angles)})...")
-        
-        cos_a = np.cos(np.radians(angle))
-        sin_a = np.sin(np.radians(angle))
-        
-        # For each rotation angle, try all combinations of scale and translation
-        for sx in sx_range:
-            if early_exit:
-                break
-            for sy in sy_range:
-                if early_exit:
-                    break
-                for dx in dx_range:
-                    if early_exit:
-                        break
-                    for dy in dy_range:
-                        iteration_count += 1
-                        
-                        # Apply transformation: Rotate → Scale → Translate
-                        transformed_sample = shapefile_sample.copy().astype(float)
-                        
-                        # Step 1: Rotate around center
-                        x_rel = transformed_sample[:, 0] - center_x
-                        y_rel = transformed_sample[:, 1] - center_y
-                        transformed_sample[:, 0] = x_rel * cos_a - y_rel * sin_a + center_x
-                        transformed_sample[:, 1] = x_rel * sin_a + y_rel * cos_a + center_y
-                        
-                        # Step 2: Scale around center
-                        transformed_sample[:, 0] = (transformed_sample[:, 0] - center_x) * sx + center_x
-                        transformed_sample[:, 1] = (transformed_sample[:, 1] - center_y) * sy + center_y
-                        
-                        # Step 3: Translate
-                        transformed_sample[:, 0] += dx
-                        transformed_sample[:, 1] += dy
-                        
-                        # Check alignment with edge detection
-                        distances, _ = image_tree.query(transformed_sample, k=1)
-                        match_tolerance = 50 if is_alaska_hawaii else 40
-                        valid_matches = distances[distances < match_tolerance]
-                        match_threshold = 0.01 if is_alaska_hawaii else 0.02
-                        
-                        if len(valid_matches) > len(shapefile_sample) * match_threshold:
-                            score = np.mean(valid_matches)
-                            match_ratio = len(valid_matches) / len(shapefile_sample)
-                            combined_score = score / (match_ratio + 0.1)
-                            
-                            # Check if this is better alignment
-                            should_accept = (
-                                combined_score < best_score or 
-                                (best_score == float('inf') and combined_score < baseline_score * 2.0) or
-                                (best_score == float('inf') and baseline_score == float('inf') and len(valid_matches) > len(shapefile_sample) * 0.05)
-                            )
-                            
-                            if should_accept:
-                                best_score = combined_score
-                                # Apply transformation to full geometries
-                                test_gdf = base_gdf.copy()
-                                test_gdf["geometry"] = test_gdf.geometry.apply(
-                                    lambda g: translate(
-                                        scale(
-                                            rotate(g, angle=angle, origin=(center_x, center_y)),
-                                            xfact=sx, yfact=sy, origin=(center_x, center_y)
-                                        ),
-                                        xoff=dx, yoff=dy
-                                    )
-                                )
-                                best_gdf = test_gdf
-                                best_angle = angle
-                                
-                                # Show if stretching/shrinking is being applied (sx != sy)
-                                stretch_info = ""
-                                if abs(sx - sy) > 0.05:  # More than 5% difference
-                                    stretch_info = f" [STRETCHED: X={sx:.3f}, Y={sy:.3f}]"
-                                print(f"      ✓ Better alignment found: angle={angle:.1f}°, score={combined_score:.2f}, matches={match_ratio:.1%}, scale=({sx:.3f},{sy:.3f}), trans=({dx:.1f},{dy:.1f}){stretch_info}")
-                                
-                                # Check if alignment is PERFECT - only stop if truly perfect
-                                # For Alaska/Hawaii, be more strict since they're harder to align
-                                perfect_threshold = 1.5 if is_alaska_hawaii else 2.0
-                                perfect_match_ratio = 0.5 if is_alaska_hawaii else 0.4
-                                
-                                if combined_score < perfect_threshold and match_ratio > perfect_match_ratio:
-                                    print(f"      ✓✓✓ PERFECT ALIGNMENT FOUND! ✓✓✓")
-                                    print(f"      Score: {combined_score:.2f}, Match ratio: {match_ratio:.1%}, Angle: {angle:.1f}°")
-                                    print(f"      Scale: X={sx:.3f}, Y={sy:.3f} (stretching/shrinking applied)")
-                                    early_exit = True
-                                    break
-                        if early_exit:
-                            break
-                    if early_exit:
-                        break
-                if early_exit:
-                    break
-            if early_exit:
-                break
+
+        # Step 1: Rotate around center - precomputed for the whole sweep
+        rotated_rel = rotated_all[angle_idx]
+
+        # For each rotation angle, coarse-to-fine search over scale and
+        # translation instead of a dense uniform sweep
+        result = _coarse_to_fine_search(
+            rotated_rel, center,
+            (sx_range[0], sx_range[-1]), (sy_range[0], sy_range[-1]),
+            (dx_range[0], dx_range[-1]), (dy_range[0], dy_range[-1]),
+            n_sample, match_tolerance, match_threshold,
+        )
+        if result is None:
+            continue
+        combined_score, match_ratio, match_count, (sx, sy, dx, dy) = result
+
+        # Check if this is better alignment
+        should_accept = (
+            combined_score < best_score or
+            (best_score == float('inf') and combined_score < baseline_score * 2.0) or
+            (best_score == float('inf') and baseline_score == float('inf') and match_count > n_sample * 0.05)
+        )
+
+        if should_accept:
+            best_score = combined_score
+            # Only record the parameters here - the full-geometry
+            # transform is applied once after the search finishes
+            best_params = (angle, sx, sy, dx, dy)
+            best_angle = angle
+
+            # Show if stretching/shrinking is being applied (sx != sy)
+            stretch_info = ""
+            if abs(sx - sy) > 0.05:  # More than 5% difference
+                stretch_info = f" [STRETCHED: X={sx:.3f}, Y={sy:.3f}]"
+            print(f"      ✓ Better alignment found: angle={angle:.1f}°, score={combined_score:.2f}, matches={match_ratio:.1%}, scale=({sx:.3f},{sy:.3f}), trans=({dx:.1f},{dy:.1f}){stretch_info}")
+
+            # Check if alignment is PERFECT - only stop if truly perfect
+            # For Alaska/Hawaii, be more strict since they're harder to align
+            perfect_threshold = 1.5 if is_alaska_hawaii else 2.0
+            perfect_match_ratio = 0.5 if is_alaska_hawaii else 0.4
+
+            if combined_score < perfect_threshold and match_ratio > perfect_match_ratio:
+                print(f"      ✓✓✓ PERFECT ALIGNMENT FOUND! ✓✓✓")
+                print(f"      Score: {combined_score:.2f}, Match ratio: {match_ratio:.1%}, Angle: {angle:.1f}°")
+                print(f"      Scale: X={sx:.3f}, Y={sy:.3f} (stretching/shrinking applied)")
+                early_exit = True
     
     print(f"\n  Iteration complete: Tested {iteration_count} combinations")
     if best_score < float('inf'):
         print(f"  Best alignment: score={best_score:.2f}, angle={best_angle:.1f}°")
     else:
         print(f"  ⚠️  No valid alignment found in iteration")
+
+    # Apply the winning transformation ONCE to the full geometries (the search
+    # itself only tracked scalar parameters)
+    if best_params is not None:
+        best_gdf = _apply_search_transform(base_gdf, *best_params, center_x, center_y)
     
     # Stage 2: Fine-tune the best match with smaller steps (if we found something)
     # This refines the alignment around the best rotation angle found
@@ -477,8 +612,22 @@ def refine_alignment_with_edge_matching(
         print(f"  Refining scale (stretching/shrinking) and position until perfect...")
         
         if best_score < 15.0:  # If we have any reasonable match, fine-tune it
-            stage2_base = best_gdf.copy()
-            stage2_sample = _extract_shapefile_edge_points(stage2_base, n_points=2000)
+            stage2_base = best_gdf
+            # stage2_base is just base_gdf with best_params applied, so obtain
+            # the stage-2 sample by transforming the stage-1 sample directly
+            # instead of re-extracting vertices from the geometries
+            if best_params is not None:
+                b_angle, b_sx, b_sy, b_dx, b_dy = best_params
+                cos_b = np.cos(np.radians(b_angle))
+                sin_b = np.sin(np.radians(b_angle))
+                rel = shapefile_sample.astype(float) - center
+                rot_b = np.empty_like(rel)
+                rot_b[:, 0] = rel[:, 0] * cos_b - rel[:, 1] * sin_b
+                rot_b[:, 1] = rel[:, 0] * sin_b + rel[:, 1] * cos_b
+                stage2_sample = rot_b * (b_sx, b_sy) + center + (b_dx, b_dy)
+            else:
+                stage2_sample = _extract_shapefile_edge_points(stage2_base, n_points=2000)
+            fine_params = None  # (angle, sx, sy, dx, dy) of the best fine-tune
             
             # Fine-tuning ranges (smaller steps around the best match)
             # For Alaska/Hawaii, allow more refinement since they need precise stretching
@@ -495,60 +644,49 @@ def refine_alignment_with_edge_matching(
                 fine_sy_range = np.linspace(0.98, 1.02, 5)  # ±2% Y scaling
                 fine_rotation_range = np.linspace(best_angle - 2.0, best_angle + 2.0, 5)  # ±2 degrees around best angle
             
-            for angle in fine_rotation_range:
-                cos_a = np.cos(np.radians(angle))
-                sin_a = np.sin(np.radians(angle))
-                for sx in fine_sx_range:
-                    for sy in fine_sy_range:
-                        for dx in fine_dx_range:
-                            for dy in fine_dy_range:
-                                # Transform sample points
-                                fine_sample = stage2_sample.copy().astype(float)
-                                
-                                # Rotate
-                                x_rel = fine_sample[:, 0] - center_x
-                                y_rel = fine_sample[:, 1] - center_y
-                                fine_sample[:, 0] = x_rel * cos_a - y_rel * sin_a + center_x
-                                fine_sample[:, 1] = x_rel * sin_a + y_rel * cos_a + center_y
-                                
-                                # Scale
-                                fine_sample[:, 0] = (fine_sample[:, 0] - center_x) * sx + center_x
-                                fine_sample[:, 1] = (fine_sample[:, 1] - center_y) * sy + center_y
-                                
-                                # Translate
-                                fine_sample[:, 0] += dx
-                                fine_sample[:, 1] += dy
-                                
-                                distances, _ = image_tree.query(fine_sample, k=1)
-                                fine_match_tolerance = 50 if is_alaska_hawaii else 30
-                                valid_matches = distances[distances < fine_match_tolerance]
-                                
-                                fine_match_threshold = 0.02 if is_alaska_hawaii else 0.05
-                                if len(valid_matches) > len(fine_sample) * fine_match_threshold:
-                                    score = np.mean(valid_matches)
-                                    match_ratio = len(valid_matches) / len(fine_sample)
-                                    combined_score = score / (match_ratio + 0.1)
-                                    
-                                    if combined_score < best_score:
-                                        best_score = combined_score
-                                        test_gdf = stage2_base.copy()
-                                        test_gdf["geometry"] = test_gdf.geometry.apply(
-                                            lambda g: translate(
-                                                scale(
-                                                    rotate(g, angle=angle, origin=(center_x, center_y)),
-                                                    xfact=sx, yfact=sy, origin=(center_x, center_y)
-                                                ),
-                                                xoff=dx, yoff=dy
-                                            )
-                                        )
-                                        best_gdf = test_gdf
-                                        print(f"  Fine-tune improved: score={combined_score:.2f}, matches={match_ratio:.1%}, angle={angle:.1f}°")
+            n_fine = len(stage2_sample)
+            fine_match_tolerance = 50 if is_alaska_hawaii else 30
+            fine_match_threshold = 0.02 if is_alaska_hawaii else 0.05
+            fine_rel = stage2_sample.astype(float) - center
+
+            # Same precomputed sweep as stage 1
+            fine_rad = np.radians(fine_rotation_range)
+            fine_cos = np.cos(fine_rad)
+            fine_sin = np.sin(fine_rad)
+            fine_rot_all = np.empty((len(fine_rotation_range),) + fine_rel.shape)
+            fine_rot_all[:, :, 0] = np.outer(fine_cos, fine_rel[:, 0]) - np.outer(fine_sin, fine_rel[:, 1])
+            fine_rot_all[:, :, 1] = np.outer(fine_sin, fine_rel[:, 0]) + np.outer(fine_cos, fine_rel[:, 1])
+
+            # Same coarse-to-fine sweep as stage 1, just over the tighter
+            # fine-tuning ranges
+            for fine_idx, angle in enumerate(fine_rotation_range):
+                fine_rot = fine_rot_all[fine_idx]
+
+                result = _coarse_to_fine_search(
+                    fine_rot, center,
+                    (fine_sx_range[0], fine_sx_range[-1]),
+                    (fine_sy_range[0], fine_sy_range[-1]),
+                    (fine_dx_range[0], fine_dx_range[-1]),
+                    (fine_dy_range[0], fine_dy_range[-1]),
+                    n_fine, fine_match_tolerance, fine_match_threshold,
+                )
+                if result is None:
+                    continue
+                combined_score, match_ratio, _, (sx, sy, dx, dy) = result
+
+                if combined_score < best_score:
+                    best_score = combined_score
+                    fine_params = (angle, sx, sy, dx, dy)
+                    print(f"  Fine-tune improved: score={combined_score:.2f}, matches={match_ratio:.1%}, angle={angle:.1f}°")
+
+            # Apply the best fine-tune ONCE on top of the stage-1 result
+            if fine_params is not None:
+                best_gdf = _apply_search_transform(stage2_base, *fine_params, center_x, center_y)
     
     # Return the best alignment found
     if best_score < float('inf'):
-        # Check if rotation was actually applied by comparing geometries
-        # If best_gdf == base_gdf, no rotation was applied
-        rotation_applied = best_gdf is not base_gdf
+        # Check if a transformation was actually accepted during the search
+        rotation_applied = best_params is not None
         
         if rotation_applied:
             print(f"\n  ✓✓✓ ROTATION APPLIED ✓✓✓")
@@ -574,31 +712,36 @@ def refine_alignment_with_edge_matching(
     if baseline_score < float('inf'):
         print(f"\n  No rotation found in grid search, trying simple rotations with wider tolerance...")
         # Try a simple rotation search with wider tolerance
-        fallback_best = None
+        fallback_angle = None
         fallback_best_score = baseline_score
-        
+
+        # Score rotated sample POINTS only; the winning rotation is applied to
+        # the full geometries once, after the loop
+        fb_sample = _extract_shapefile_edge_points(base_gdf, n_points=500)
+        fb_rel = fb_sample.astype(float) - center if len(fb_sample) > 0 else fb_sample
         for test_angle in [-20, -15, -10, -5, 5, 10, 15, 20]:
-            test_gdf = base_gdf.copy()
-            test_gdf["geometry"] = test_gdf.geometry.apply(
-                lambda g: rotate(g, angle=test_angle, origin=(center_x, center_y))
-            )
-            test_sample = _extract_shapefile_edge_points(test_gdf, n_points=500)
-            if len(test_sample) > 0:
-                test_distances, _ = image_tree.query(test_sample, k=1)
-                test_valid = test_distances[test_distances < 50]  # Wider tolerance
-                if len(test_valid) > len(test_sample) * 0.03:
-                    test_score = np.mean(test_valid)
-                    test_ratio = len(test_valid) / len(test_sample)
-                    test_combined = test_score / (test_ratio + 0.1)
-                    if test_combined < fallback_best_score * 1.2:  # Accept if within 20% of best
-                        print(f"    ✓ Found rotation at {test_angle}°: score={test_combined:.2f} (baseline: {baseline_score:.2f})")
-                        fallback_best = test_gdf
-                        fallback_best_score = test_combined
-        
-        if fallback_best is not None:
+            if len(fb_sample) == 0:
+                break
+            cos_t = np.cos(np.radians(test_angle))
+            sin_t = np.sin(np.radians(test_angle))
+            test_sample = np.empty_like(fb_rel)
+            test_sample[:, 0] = fb_rel[:, 0] * cos_t - fb_rel[:, 1] * sin_t + center_x
+            test_sample[:, 1] = fb_rel[:, 0] * sin_t + fb_rel[:, 1] * cos_t + center_y
+            test_distances = _nearest_edge_distances(test_sample)
+            test_valid = test_distances[test_distances < 50]  # Wider tolerance
+            if len(test_valid) > len(test_sample) * 0.03:
+                test_score = np.mean(test_valid)
+                test_ratio = len(test_valid) / len(test_sample)
+                test_combined = test_score / (test_ratio + 0.1)
+                if test_combined < fallback_best_score * 1.2:  # Accept if within 20% of best
+                    print(f"    ✓ Found rotation at {test_angle}°: score={test_combined:.2f} (baseline: {baseline_score:.2f})")
+                    fallback_angle = test_angle
+                    fallback_best_score = test_combined
+
+        if fallback_angle is not None:
             print(f"  ✓✓✓ FALLBACK ROTATION APPLIED ✓✓✓")
             print(f"  Applied rotation with score: {fallback_best_score:.2f}")
-            return fallback_best
+            return _apply_search_transform(base_gdf, fallback_angle, 1.0, 1.0, 0.0, 0.0, center_x, center_y)
     
     # Last resort: Force rotation search - try all rotation angles and always apply the best one found
     if is_alaska_hawaii:
@@ -610,33 +753,35 @@ def refine_alignment_with_edge_matching(
         print(f"  Trying rotation angles: ±45° in 5° steps...")
         rotation_range_full = np.linspace(-45, 45, 19)  # Every 5 degrees from -45 to +45
     
-    force_best_gdf = None
     force_best_score = float('inf')
-    force_best_angle = 0
-    
-    # Try a comprehensive rotation search with very lenient matching
+    force_best_angle = None
+
+    # Try a comprehensive rotation search with very lenient matching - again
+    # scoring rotated sample points only and materializing the winner once
+    force_sample = _extract_shapefile_edge_points(base_gdf, n_points=min(1000, len(shapefile_edges)))
+    force_rel = force_sample.astype(float) - center if len(force_sample) > 0 else force_sample
     for test_angle in rotation_range_full:
-        test_gdf = base_gdf.copy()
-        test_gdf["geometry"] = test_gdf.geometry.apply(
-            lambda g: rotate(g, angle=test_angle, origin=(center_x, center_y))
-        )
-        test_sample = _extract_shapefile_edge_points(test_gdf, n_points=min(1000, len(shapefile_edges)))
-        if len(test_sample) > 0:
-            test_distances, _ = image_tree.query(test_sample, k=1)
-            test_valid = test_distances[test_distances < 100]  # Very wide tolerance
-            if len(test_valid) > len(test_sample) * 0.01:  # Very lenient - just 1% match
-                test_score = np.mean(test_valid)
-                test_ratio = len(test_valid) / len(test_sample)
-                test_combined = test_score / (test_ratio + 0.1)
-                if test_combined < force_best_score:
-                    force_best_score = test_combined
-                    force_best_gdf = test_gdf
-                    force_best_angle = test_angle
-    
-    if force_best_gdf is not None:
+        if len(force_sample) == 0:
+            break
+        cos_t = np.cos(np.radians(test_angle))
+        sin_t = np.sin(np.radians(test_angle))
+        test_sample = np.empty_like(force_rel)
+        test_sample[:, 0] = force_rel[:, 0] * cos_t - force_rel[:, 1] * sin_t + center_x
+        test_sample[:, 1] = force_rel[:, 0] * sin_t + force_rel[:, 1] * cos_t + center_y
+        test_distances = _nearest_edge_distances(test_sample)
+        test_valid = test_distances[test_distances < 100]  # Very wide tolerance
+        if len(test_valid) > len(test_sample) * 0.01:  # Very lenient - just 1% match
+            test_score = np.mean(test_valid)
+            test_ratio = len(test_valid) / len(test_sample)
+            test_combined = test_score / (test_ratio + 0.1)
+            if test_combined < force_best_score:
+                force_best_score = test_combined
+                force_best_angle = test_angle
+
+    if force_best_angle is not None:
         print(f"  ✓✓✓ FORCED ROTATION APPLIED ✓✓✓")
         print(f"  Applied rotation of {force_best_angle:.1f}° (score: {force_best_score:.2f})")
-        return force_best_gdf
+        return _apply_search_transform(base_gdf, force_best_angle, 1.0, 1.0, 0.0, 0.0, center_x, center_y)
     
     print(f"\n  ❌ No rotation could be applied - edge detection completely failed")
     print(f"  Baseline score: {baseline_score:.2f if baseline_score < float('inf') else 'N/A'}")
@@ -644,19 +789,21 @@ def refine_alignment_with_edge_matching(
     return gdf_px
 
 
-def _edge_overlap_score(image_path: str, gdf_px: gpd.GeoDataFrame) -> float:
+@lru_cache(maxsize=4)
+def _detect_image_edges_fullframe(image_path: str, mtime: float) -> Optional[Tuple[np.ndarray, int, int]]:
     """
-    Rasterize county boundaries as 1-pixel lines and score overlap with detected edges.
-    Uses the same multi-method edge detection as _detect_image_edges for consistency.
-    Returns score between 0 and 1, where 1 is perfect overlap.
+    Detect edges over the FULL image (no bbox crop) and return (edges, h, w).
+    Cached on (path, mtime) because the edge map is independent of the candidate
+    geometries being scored - fit_with_autoinset scores several insets against
+    the same image.
     """
     img = cv2.imread(str(image_path))
     if img is None:
-        return 0.0
-    
+        return None
+
     h, w = img.shape[:2]
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    
+
     # Use same multi-method edge detection as _detect_image_edges
     blur = cv2.GaussianBlur(gray, (3, 3), 0)
     
@@ -666,15 +813,19 @@ def _edge_overlap_score(image_path: str, gdf_px: gpd.GeoDataFrame) -> float:
     edges_high = cv2.Canny(blur, 50, 150)
     edges_canny = cv2.bitwise_or(edges_low, cv2.bitwise_or(edges_mid, edges_high))
     
-    # Color gradient edges
-    lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
-    l_channel = lab[:, :, 0]
-    sobel_x = cv2.Sobel(l_channel, cv2.CV_64F, 1, 0, ksize=3)
-    sobel_y = cv2.Sobel(l_channel, cv2.CV_64F, 0, 1, ksize=3)
-    gradient_magnitude = np.sqrt(sobel_x**2 + sobel_y**2)
-    if gradient_magnitude.max() > 0:
-        gradient_norm = np.uint8(255 * gradient_magnitude / gradient_magnitude.max())
-        _, gradient_edges = cv2.threshold(gradient_norm, 15, 255, cv2.THRESH_BINARY)
+    # Intensity gradient edges - grayscale tracks the LAB L channel closely
+    # for printed maps, so reuse gray instead of paying for a BGR->LAB
+    # conversion that only fed the L-channel Sobel
+    sobel_x, sobel_y = cv2.spatialGradient(gray, ksize=3)
+    fx = sobel_x.astype(np.float32)
+    fy = sobel_y.astype(np.float32)
+    # The magnitude is only compared against 15/255 of its max - a monotone
+    # cut, so threshold the SQUARED magnitude instead and skip the per-pixel
+    # sqrt and the normalization pass entirely
+    mag2 = fx * fx + fy * fy
+    max2 = float(mag2.max())
+    if max2 > 0:
+        gradient_edges = cv2.compare(mag2, (15.0 / 255.0) ** 2 * max2, cv2.CMP_GT)
     else:
         gradient_edges = np.zeros_like(gray, dtype=np.uint8)
     
@@ -693,21 +844,47 @@ def _edge_overlap_score(image_path: str, gdf_px: gpd.GeoDataFrame) -> float:
     kernel = np.ones((2, 2), np.uint8)
     edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel, iterations=1)
     edges = cv2.dilate(edges, kernel, iterations=1)
-    
-    # Rasterize borders
-    line = Image.new("L", (w, h), 0)
-    draw = ImageDraw.Draw(line)
+
+    return edges, h, w
+
+
+def _edge_overlap_score(
+    image_path: str,
+    gdf_px: gpd.GeoDataFrame,
+    edges_hw: Optional[Tuple[np.ndarray, int, int]] = None,
+) -> float:
+    """
+    Rasterize county boundaries as 1-pixel lines and score overlap with detected edges.
+    Uses the same multi-method edge detection as _detect_image_edges for consistency.
+    Pass edges_hw (from _detect_image_edges_fullframe) to reuse a precomputed
+    edge map; otherwise it is computed (and cached) here.
+    Returns score between 0 and 1, where 1 is perfect overlap.
+    """
+    if edges_hw is None:
+        try:
+            mtime = os.path.getmtime(image_path)
+        except OSError:
+            return 0.0
+        edges_hw = _detect_image_edges_fullframe(str(image_path), mtime)
+    if edges_hw is None:
+        return 0.0
+    edges, h, w = edges_hw
+
+    # Rasterize borders - one batched cv2.polylines call instead of a PIL
+    # ImageDraw.line per polygon
+    line_arr = np.zeros((h, w), np.uint8)
+    rings = []
     for geom in gdf_px.geometry:
         if geom is None or geom.is_empty:
             continue
         polys = list(geom.geoms) if geom.geom_type == "MultiPolygon" else [geom]
         for poly in polys:
-            coords = list(poly.exterior.coords)
+            coords = np.asarray(poly.exterior.coords)
             if len(coords) >= 2:
-                draw.line(coords, fill=255, width=1)
-    
-    line_arr = np.array(line)
-    
+                rings.append(np.round(coords).astype(np.int32))
+    if rings:
+        cv2.polylines(line_arr, rings, isClosed=False, color=255, thickness=1)
+
     # Overlap score: percentage of rasterized borders that overlap with Canny edges
     overlap = (line_arr > 0) & (edges > 0)
     denom = max(1, (line_arr > 0).sum())
@@ -727,27 +904,42 @@ def fit_with_autoinset(
     Returns: (best_gdf_px, best_score, chosen_inset)
     """
     best = (None, -1.0, None)  # (gdf_px, score, inset)
-    
+
+    # Detect edges once - the edge map does not depend on the inset candidate
+    try:
+        mtime = os.path.getmtime(image_path)
+        edges_hw = _detect_image_edges_fullframe(str(image_path), mtime)
+    except OSError:
+        edges_hw = None
+
+    # Extract source coordinates and bounds once - only the affine parameters
+    # depend on the inset candidate
+    base_geoms = shp.geometry.values
+    base_coords = shapely.get_coordinates(base_geoms)
+    src_bounds = shp.total_bounds
+
+    # Clip polygon is also inset-independent
+    if polygon and len(polygon) >= 3:
+        clip_poly = Polygon(polygon)
+    else:
+        x0, y0, x1, y1 = bbox
+        clip_poly = Polygon([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
+
     for inset in inset_candidates:
-        gdf_px = fit_gdf_to_bbox_pixels(
-            shp, bbox=bbox, polygon=None, keep_aspect=keep_aspect, inset_px=inset
-        )
-        
+        sx, sy, dx_final, dy_final = _bbox_fit_params(src_bounds, bbox, keep_aspect, inset)
+        new_coords = np.empty_like(base_coords)
+        new_coords[:, 0] = base_coords[:, 0] * sx + dx_final
+        new_coords[:, 1] = base_coords[:, 1] * -sy + dy_final
+        gdf_px = shp.copy()
+        gdf_px.geometry = shapely.set_coordinates(base_geoms.copy(), new_coords)
+
         # Clip before scoring to avoid legend lines biasing the score
-        if polygon and len(polygon) >= 3:
-            clip_poly = Polygon(polygon)
-        else:
-            x0, y0, x1, y1 = bbox
-            clip_poly = Polygon([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
-        
-        gdf_px_clip = gdf_px.copy()
-        gdf_px_clip["geometry"] = gdf_px_clip.geometry.intersection(clip_poly)
-        gdf_px_clip = gdf_px_clip[~gdf_px_clip.geometry.is_empty]
+        gdf_px_clip = _clip_to_polygon(gdf_px, clip_poly)
         
         if len(gdf_px_clip) == 0:
             continue
             
-        s = _edge_overlap_score(image_path, gdf_px_clip)
+        s = _edge_overlap_score(image_path, gdf_px_clip, edges_hw=edges_hw)
         if s > best[1]:
             best = (gdf_px_clip, s, inset)
     
@@ -762,8 +954,7 @@ def fit_with_autoinset(
         else:
             x0, y0, x1, y1 = bbox
             clip_poly = Polygon([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
-        gdf_px_clip = gdf_px.copy()
-        gdf_px_clip["geometry"] = gdf_px_clip.geometry.intersection(clip_poly)
+        gdf_px_clip = _clip_to_polygon(gdf_px, clip_poly)
         return (gdf_px_clip, 0.0, default_inset)
     
     return best
@@ -802,9 +993,7 @@ def render_overlay_full_image(
         x0, y0, x1, y1 = bbox
         clip_poly = Polygon([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
     
-    gdf_px = gdf_px.copy()
-    gdf_px["geometry"] = gdf_px.geometry.intersection(clip_poly)
-    gdf_px = gdf_px[~gdf_px.geometry.is_empty]
+    gdf_px = _clip_to_polygon(gdf_px, clip_poly)
     
     # 4) Draw over FULL image (no translate)
     base = Image.open(image_path).convert("RGBA")
@@ -4,7 +4,10 @@ Uses 4-point homography to map from geographic bounds to pixel rect4.
 """
 
 import numpy as np
+import cv2
+from functools import lru_cache
 from typing import Tuple, List
+import shapely
 from shapely.geometry import Point, LineString, Polygon, MultiLineString, MultiPolygon
 from shapely.ops import transform as shp_transform
 import geopandas as gpd
@@ -13,20 +16,28 @@ import geopandas as gpd
 def rect_bounds_to_corners(bounds: Tuple[float, float, float, float], is_geographic: bool = True) -> np.ndarray:
     """
     Convert bounding box [xmin, ymin, xmax, ymax] to four corners (clockwise).
-    
+
     Args:
         bounds: [xmin, ymin, xmax, ymax]
         is_geographic: If True, ymax is north (geographic coords). If False, ymin is top (pixel coords).
-    
+
     Returns:
         Corners in order: TL, TR, BR, BL (clockwise)
         For geographic: TL=(xmin, ymax), TR=(xmax, ymax), BR=(xmax, ymin), BL=(xmin, ymin)
         For pixel: TL=(xmin, ymin), TR=(xmax, ymin), BR=(xmax, ymax), BL=(xmin, ymax)
+
+    The result is memoized per (bounds, is_geographic) and returned as a
+    read-only array - the same region bounds recur across overlay renders.
     """
+    return _rect_bounds_to_corners_cached(tuple(float(b) for b in bounds), is_geographic)
+
+
+@lru_cache(maxsize=32)
+def _rect_bounds_to_corners_cached(bounds: Tuple[float, float, float, float], is_geographic: bool) -> np.ndarray:
     xmin, ymin, xmax, ymax = bounds
     if is_geographic:
         # Geographic: Y increases northward, so top (north) has larger Y
-        return np.array([
+        corners = np.array([
             [xmin, ymax],  # Top-left (north-west)
             [xmax, ymax],  # Top-right (north-east)
             [xmax, ymin],  # Bottom-right (south-east)
@@ -34,12 +45,15 @@ def rect_bounds_to_corners(bounds: Tuple[float, float, float, float], is_geograp
         ], dtype=float)
     else:
         # Pixel: Y increases downward, so top has smaller Y
-        return np.array([
+        corners = np.array([
             [xmin, ymin],  # Top-left
             [xmax, ymin],  # Top-right
             [xmax, ymax],  # Bottom-right
             [xmin, ymax],  # Bottom-left
         ], dtype=float)
+    # Cached and shared between callers - guard against accidental mutation
+    corners.flags.writeable = False
+    return corners
 
 
 def affine_from_3pts(src3: np.ndarray, dst3: np.ndarray) -> np.ndarray:
@@ -59,26 +73,52 @@ def affine_from_3pts(src3: np.ndarray, dst3: np.ndarray) -> np.ndarray:
     #                              [d]
     #                              [e]
     #                              [f]
-    A_rows = []
-    b_vec = []
-    for (x, y), (X, Y) in zip(src3, dst3):
-        A_rows.append([x, y, 1, 0, 0, 0])
-        A_rows.append([0, 0, 0, x, y, 1])
-        b_vec.extend([X, Y])
-    
-    A = np.array(A_rows)
-    b = np.array(b_vec)
-    
-    # Solve Ax = b using least squares
+    # Preallocated and filled by strided slicing - no Python loop
+    src3 = np.asarray(src3, dtype=float)
+    dst3 = np.asarray(dst3, dtype=float)
+    A = np.zeros((2 * len(src3), 6))
+    A[0::2, 0] = src3[:, 0]
+    A[0::2, 1] = src3[:, 1]
+    A[0::2, 2] = 1
+    A[1::2, 3] = src3[:, 0]
+    A[1::2, 4] = src3[:, 1]
+    A[1::2, 5] = 1
+    b = dst3.reshape(-1)
+
+    # Exactly determined for 3 correspondences: one LU solve instead of the
+    # SVD-backed pseudoinverse in lstsq
+    if len(src3) == 3:
+        try:
+            return np.linalg.solve(A, b).reshape(2, 3)
+        except np.linalg.LinAlgError:
+            pass  # degenerate (collinear) triangle - fall back to lstsq
+
     params = np.linalg.lstsq(A, b, rcond=None)[0]
-    
-    # Reshape to 2x3 matrix
-    affine_matrix = params.reshape(2, 3)
-    return affine_matrix
+    return params.reshape(2, 3)
+
+
+def apply_affine_to_coords(coords: np.ndarray, A: np.ndarray, dtype=np.float64) -> np.ndarray:
+    """
+    Apply a 2x3 affine transformation to an (N, 2) coordinate array in one
+    batched matmul.
+
+    Args:
+        dtype: np.float32 halves memory traffic for raster-bound consumers
+            that only need sub-pixel accuracy (e.g. drawing with cv2)
+
+    Returns:
+        (N, 2) array of transformed coordinates
+    """
+    coords = np.asarray(coords, dtype=dtype)
+    A = np.asarray(A, dtype=dtype)
+    return coords @ A[:, :2].T + A[:, 2]
 
 
 def apply_affine_to_xy(x: float, y: float, A: np.ndarray) -> tuple:
-    """Apply 2x3 affine transformation to a point."""
+    """
+    Apply 2x3 affine transformation to a point.
+    Slow path - use apply_affine_to_coords for arrays of points.
+    """
     src_vec = np.array([x, y, 1.0])
     dst_vec = A @ src_vec
     return (dst_vec[0], dst_vec[1])
@@ -86,48 +126,14 @@ def apply_affine_to_xy(x: float, y: float, A: np.ndarray) -> tuple:
 
 def apply_affine_to_geometry(geom, A: np.ndarray):
     """Apply 2x3 affine transformation to a Shapely geometry."""
-    from shapely.geometry import Point, LineString, Polygon, MultiPoint, MultiLineString, MultiPolygon
-    
     if geom is None or geom.is_empty:
         return geom
-    
-    def transform_point(pt):
-        x, y = pt.coords[0]
-        x_new, y_new = apply_affine_to_xy(x, y, A)
-        return Point(x_new, y_new)
-    
-    def transform_linestring(ls):
-        coords = [apply_affine_to_xy(x, y, A) for x, y in ls.coords]
-        return LineString(coords)
-    
-    def transform_polygon(poly):
-        exterior = transform_linestring(poly.exterior)
-        interiors = [transform_linestring(interior) for interior in poly.interiors]
-        return Polygon(exterior, interiors)
-    
-    geom_type = geom.geom_type
-    
-    if geom_type == "Point":
-        return transform_point(geom)
-    elif geom_type == "LineString":
-        return transform_linestring(geom)
-    elif geom_type == "Polygon":
-        return transform_polygon(geom)
-    elif geom_type == "MultiPoint":
-        return MultiPoint([transform_point(pt) for pt in geom.geoms])
-    elif geom_type == "MultiLineString":
-        return MultiLineString([transform_linestring(ls) for ls in geom.geoms])
-    elif geom_type == "MultiPolygon":
-        return MultiPolygon([transform_polygon(poly) for poly in geom.geoms])
-    else:
-        # Fallback
-        coords = [apply_affine_to_xy(x, y, A) for x, y in geom.coords]
-        if len(coords) == 1:
-            return Point(coords[0])
-        elif len(coords) == 2:
-            return LineString(coords)
-        else:
-            return Polygon(coords)
+
+    # Same batched pattern as apply_homography_to_geometry: one matmul over
+    # every vertex, with set_coordinates preserving ring/part structure
+    coords = shapely.get_coordinates(geom)
+    new_coords = apply_affine_to_coords(coords, A)
+    return shapely.set_coordinates(np.array([geom], dtype=object), new_coords)[0]
 
 
 def homography_from_4pts(src4: np.ndarray, dst4: np.ndarray) -> np.ndarray:
@@ -141,31 +147,144 @@ def homography_from_4pts(src4: np.ndarray, dst4: np.ndarray) -> np.ndarray:
     Returns:
         3x3 homography matrix H (normalized so H[2,2] = 1)
     """
-    def A_row(x, y, X, Y):
-        """Build two rows of the A matrix for one point correspondence."""
-        return np.array([
-            [x, y, 1, 0, 0, 0, -X*x, -X*y, -X],
-            [0, 0, 0, x, y, 1, -Y*x, -Y*y, -Y]
-        ])
-    
-    # Build the full A matrix (8x9)
-    A_rows = []
-    for (x, y), (X, Y) in zip(src4, dst4):
-        A_rows.append(A_row(x, y, X, Y))
-    A = np.vstack(A_rows)
-    
+    src4 = np.asarray(src4, dtype=float)
+    dst4 = np.asarray(dst4, dtype=float)
+
+    # OpenCV's hand-tuned C++ 4-point DLT does the same 8x8 closed-form
+    # solve (H[2,2]=1) without any Python-level matrix assembly. Input must
+    # be float32; the quantization is relative (~1e-7), i.e. far below a
+    # pixel even at projected-CRS magnitudes
+    if len(src4) == 4:
+        try:
+            return cv2.getPerspectiveTransform(
+                src4.astype(np.float32), dst4.astype(np.float32)
+            ).astype(np.float64)
+        except cv2.error:
+            pass  # degenerate correspondences - fall back to the NumPy paths
+
+    # Build the full A matrix (8x9) in place: two rows per correspondence,
+    # filled by strided slicing instead of stacking per-point sub-arrays
+    x, y = src4[:, 0], src4[:, 1]
+    X, Y = dst4[:, 0], dst4[:, 1]
+    A = np.zeros((2 * len(src4), 9))
+    A[0::2, 0] = x
+    A[0::2, 1] = y
+    A[0::2, 2] = 1
+    A[0::2, 6] = -X * x
+    A[0::2, 7] = -X * y
+    A[0::2, 8] = -X
+    A[1::2, 3] = x
+    A[1::2, 4] = y
+    A[1::2, 5] = 1
+    A[1::2, 6] = -Y * x
+    A[1::2, 7] = -Y * y
+    A[1::2, 8] = -Y
+
+    # For exactly 4 correspondences the system is square once H[2,2] is fixed
+    # to 1: solve A[:, :8] @ h8 = -A[:, 8] directly (one LU solve) instead of
+    # extracting the nullspace of the 8x9 matrix with a full SVD
+    if len(src4) == 4:
+        try:
+            h8 = np.linalg.solve(A[:, :8], -A[:, 8])
+            return np.append(h8, 1.0).reshape(3, 3)
+        except np.linalg.LinAlgError:
+            pass  # degenerate correspondences - fall back to SVD
+
     # Solve Ah=0 using SVD (h is the last column of V^T)
     _, _, vh = np.linalg.svd(A)
     H = vh[-1, :].reshape(3, 3)
-    
+
     # Normalize so H[2,2] = 1
     return H / H[2, 2]
 
 
+def batched_homography_4pts(srcs: np.ndarray, dsts: np.ndarray) -> np.ndarray:
+    """
+    Compute homographies for R regions at once from stacked 4-point
+    correspondences.
+
+    Stack the per-region rect4 arrays up-front ((R, 4, 2) srcs and dsts,
+    e.g. np.stack([conus_rect4, alaska_rect4, hawaii_rect4])) and solve all
+    R 8x8 systems in a single batched LAPACK call instead of R separate
+    homography_from_4pts invocations.
+
+    Args:
+        srcs: (R, 4, 2) source corners per region
+        dsts: (R, 4, 2) destination corners per region
+
+    Returns:
+        (R, 3, 3) homography matrices, each normalized so H[2,2] = 1
+    """
+    srcs = np.asarray(srcs, dtype=float)
+    dsts = np.asarray(dsts, dtype=float)
+    n_regions = len(srcs)
+
+    # Same strided fill as homography_from_4pts, with a leading batch axis
+    x, y = srcs[..., 0], srcs[..., 1]  # (R, 4)
+    X, Y = dsts[..., 0], dsts[..., 1]
+    A = np.zeros((n_regions, 8, 9))
+    A[:, 0::2, 0] = x
+    A[:, 0::2, 1] = y
+    A[:, 0::2, 2] = 1
+    A[:, 0::2, 6] = -X * x
+    A[:, 0::2, 7] = -X * y
+    A[:, 0::2, 8] = -X
+    A[:, 1::2, 3] = x
+    A[:, 1::2, 4] = y
+    A[:, 1::2, 5] = 1
+    A[:, 1::2, 6] = -Y * x
+    A[:, 1::2, 7] = -Y * y
+    A[:, 1::2, 8] = -Y
+
+    try:
+        # b must keep an explicit trailing column axis for the batched gufunc
+        h8 = np.linalg.solve(A[:, :, :8], -A[:, :, 8:9])[:, :, 0]
+    except np.linalg.LinAlgError:
+        # A degenerate member poisons the whole batch - fall back to the
+        # scalar solver so the healthy regions still get their SVD rescue
+        return np.stack([homography_from_4pts(s, d) for s, d in zip(srcs, dsts)])
+
+    return np.concatenate([h8, np.ones((n_regions, 1))], axis=1).reshape(n_regions, 3, 3)
+
+
+def apply_H_to_coords(coords: np.ndarray, H: np.ndarray, dtype=np.float64) -> np.ndarray:
+    """
+    Apply homography H to an (N, 2) coordinate array in one batched matmul.
+
+    Args:
+        dtype: np.float32 halves memory traffic for raster-bound consumers
+            that only need sub-pixel accuracy (e.g. drawing with cv2)
+
+    Returns:
+        (N, 2) array of transformed coordinates
+    """
+    coords = np.asarray(coords, dtype=dtype)
+    H = np.asarray(H, dtype=dtype)
+
+    # Affine fast path: when the projective row is [0, 0, w] the divisor is
+    # constant, so skip the homogeneous padding and the per-point divide
+    if abs(H[2, 0]) < 1e-12 and abs(H[2, 1]) < 1e-12:
+        M2 = H[:2, :2] / H[2, 2]
+        t = H[:2, 2] / H[2, 2]
+        return coords @ M2.T + t
+
+    # Projective path: expand the matmul into per-column multiply-adds so no
+    # (N, 3) homogeneous buffer is allocated and the divide lands straight in
+    # the output array
+    x = coords[:, 0]
+    y = coords[:, 1]
+    w = H[2, 0] * x + H[2, 1] * y + H[2, 2]
+    out = np.empty_like(coords)
+    out[:, 0] = (H[0, 0] * x + H[0, 1] * y + H[0, 2]) / w
+    out[:, 1] = (H[1, 0] * x + H[1, 1] * y + H[1, 2]) / w
+    return out
+
+
 def apply_H_to_xy(x: float, y: float, H: np.ndarray) -> Tuple[float, float]:
     """
     Apply homography H to a single (x, y) point.
-    
+    Slow path - use apply_H_to_coords for arrays of points.
+
     Returns:
         (x', y') in pixel coordinates
     """
@@ -177,60 +296,31 @@ def apply_H_to_xy(x: float, y: float, H: np.ndarray) -> Tuple[float, float]:
 def apply_homography_to_geometry(geom, H: np.ndarray):
     """
     Apply homography H to a Shapely geometry.
-    
+
     Args:
         geom: Shapely geometry (Point, LineString, Polygon, etc.)
         H: 3x3 homography matrix
-    
+
     Returns:
         Transformed geometry
     """
     if geom is None or geom.is_empty:
         return geom
-    
-    def transform_point(pt):
-        x, y = pt.coords[0]
-        x_new, y_new = apply_H_to_xy(x, y, H)
-        return Point(x_new, y_new)
-    
-    def transform_linestring(ls):
-        coords = [apply_H_to_xy(x, y, H) for x, y in ls.coords]
-        return LineString(coords)
-    
-    def transform_polygon(poly):
-        exterior = transform_linestring(poly.exterior)
-        interiors = [transform_linestring(interior) for interior in poly.interiors]
-        return Polygon(exterior, interiors)
-    
-    geom_type = geom.geom_type
-    
-    if geom_type == "Point":
-        return transform_point(geom)
-    elif geom_type == "LineString":
-        return transform_linestring(geom)
-    elif geom_type == "Polygon":
-        return transform_polygon(geom)
-    elif geom_type == "MultiPoint":
-        return type(geom)([transform_point(pt) for pt in geom.geoms])
-    elif geom_type == "MultiLineString":
-        return MultiLineString([transform_linestring(ls) for ls in geom.geoms])
-    elif geom_type == "MultiPolygon":
-        return MultiPolygon([transform_polygon(poly) for poly in geom.geoms])
-    else:
-        # Fallback: try to transform coordinates directly
-        coords = [apply_H_to_xy(x, y, H) for x, y in geom.coords]
-        if len(coords) == 1:
-            return Point(coords[0])
-        elif len(coords) == 2:
-            return LineString(coords)
-        else:
-            return Polygon(coords)
+
+    # Flatten every vertex (all rings and parts) into one (N, 2) array, apply
+    # H as a single batched matmul and rebuild the geometry in one call -
+    # set_coordinates preserves the ring/part structure for every geometry
+    # type, so no per-type recursion is needed
+    coords = shapely.get_coordinates(geom)
+    new_coords = apply_H_to_coords(coords, H)
+    return shapely.set_coordinates(np.array([geom], dtype=object), new_coords)[0]
 
 
 def transform_gdf_with_homography(
     gdf: gpd.GeoDataFrame,
     src_bounds: Tuple[float, float, float, float],
     dst_rect4: List[Tuple[int, int]],
+    inplace: bool = False,
 ) -> gpd.GeoDataFrame:
     """
     Transform a GeoDataFrame using homography from source bounds to destination rect4.
@@ -242,7 +332,9 @@ def transform_gdf_with_homography(
         gdf: GeoDataFrame in source CRS (should be EPSG:5070 for Albers projection)
         src_bounds: Source bounding box [xmin, ymin, xmax, ymax] in gdf's CRS
         dst_rect4: Destination rectangle as 4 corners [(x1,y1), (x2,y2), (x3,y3), (x4,y4)] clockwise
-    
+        inplace: If True, overwrite gdf's geometry column instead of copying
+            the attribute table (callers that discard the source frame)
+
     Returns:
         Transformed GeoDataFrame in pixel coordinates (no CRS)
     """
@@ -261,21 +353,79 @@ def transform_gdf_with_homography(
     sx = W_rect / src_w if src_w > 0 else 0
     sy = H_rect / src_h if src_h > 0 else 0
     
-    # Affine transformation matrix for shapely.affinity.affine_transform
-    # Format: [a, b, d, e, xoff, yoff]
-    # [[a, b, xoff],
-    #  [d, e, yoff],
-    #  [0, 0, 1   ]]
+    # Affine map: x' = sx*x + xoff, y' = -sy*y + yoff
     # Y goes down in image pixels -> flip Y with -sy and anchor at y2 (bottom)
-    A = [sx, 0, 0, -sy, x1 - xmin * sx, y2 + ymin * sy]
-    
-    # Apply affine transformation
-    from shapely.affinity import affine_transform
-    gdf_px = gdf.copy()
-    gdf_px["geometry"] = gdf_px.geometry.apply(
-        lambda geom: affine_transform(geom, A)
-    )
+    scale_mat = np.array([[sx, 0.0], [0.0, -sy]])
+    offset = np.array([x1 - xmin * sx, y2 + ymin * sy])
+
+    # One GEMM over the full contiguous coordinate buffer of the frame, then
+    # rebuild the geometries in a single set_coordinates call
+    geoms = gdf.geometry.values
+    coords = shapely.get_coordinates(geoms)
+    new_coords = coords @ scale_mat.T + offset
+
+    # Shallow copy: the attribute columns are shared (never mutated here),
+    # only the geometry column is replaced with the freshly-built array
+    gdf_px = gdf if inplace else gdf.copy(deep=False)
+    gdf_px["geometry"] = shapely.set_coordinates(geoms.copy(), new_coords)
     gdf_px.crs = None  # Remove CRS since we're in pixel space
-    
+
     return gdf_px
 
+
+def get_region_bounds_from_outline(outline_path: str) -> List[float]:
+    """Get tight bounds [xmin, ymin, xmax, ymax] from an outline shapefile."""
+    gdf = gpd.read_file(outline_path)
+    return gdf.total_bounds.tolist()
+
+
+def create_homography_for_region(
+    outline_shapefile: str,
+    rect4_pixels: List[Tuple[int, int]]
+) -> np.ndarray:
+    """
+    Create homography matrix to map from geographic coords to pixel coords.
+
+    Args:
+        outline_shapefile: Path to outline shapefile
+        rect4_pixels: 4 corners in pixel coordinates [(x1,y1),(x2,y2),(x3,y3),(x4,y4)]
+
+    Returns:
+        3x3 homography matrix
+    """
+    src_bounds = get_region_bounds_from_outline(outline_shapefile)
+    src4 = rect_bounds_to_corners(src_bounds)
+    dst4 = np.array(rect4_pixels, dtype=float)
+    return homography_from_4pts(src4, dst4)
+
+
+def transform_gdf_with_matrix(gdf: gpd.GeoDataFrame, H: np.ndarray) -> gpd.GeoDataFrame:
+    """
+    Transform every geometry in a GeoDataFrame with a precomputed 3x3
+    homography matrix (homography counterpart of transform_gdf_with_affine).
+
+    One get_coordinates/set_coordinates round trip over the whole frame -
+    no per-geometry apply.
+    """
+    geoms = gdf.geometry.values
+    coords = shapely.get_coordinates(geoms)
+    new_coords = apply_H_to_coords(coords, H)
+    out = gdf.copy(deep=False)
+    out["geometry"] = shapely.set_coordinates(geoms.copy(), new_coords)
+    out.crs = None
+    return out
+
+
+def transform_gdf_with_affine(gdf: gpd.GeoDataFrame, A: np.ndarray) -> gpd.GeoDataFrame:
+    """
+    Transform every geometry in a GeoDataFrame with a precomputed 2x3
+    affine matrix (affine counterpart of transform_gdf_with_matrix).
+    """
+    geoms = gdf.geometry.values
+    coords = shapely.get_coordinates(geoms)
+    new_coords = apply_affine_to_coords(coords, A)
+    out = gdf.copy(deep=False)
+    out["geometry"] = shapely.set_coordinates(geoms.copy(), new_coords)
+    out.crs = None
+    return out
+
@@ -3,27 +3,209 @@ Generate overlay preview showing shapefile boundaries on the uploaded image.
 Uses separate region shapefiles (CONUS, Alaska, Hawaii) with affine transformations.
 """
 
+import logging
 import os
 import numpy as np
 import cv2
+import shapely
 import geopandas as gpd
 import pandas as pd
-from PIL import Image, ImageDraw
+import pyogrio
+from pyproj import CRS
 from shapely.geometry import Polygon
-from shapely.affinity import affine_transform
 from typing import Optional, Dict, Tuple, List
-from rasterio.features import rasterize
-from affine import Affine
 
 try:
-    from utils.geo_align import fit_gdf_to_bbox_pixels, fit_with_autoinset
-    from utils.homography import transform_gdf_with_homography, rect_bounds_to_corners
+    from utils.geo_align import (
+        fit_gdf_to_bbox_pixels,
+        fit_with_autoinset,
+        refine_alignment_with_edge_matching,
+    )
+    from utils.homography import (
+        transform_gdf_with_homography,
+        transform_gdf_with_matrix,
+        transform_gdf_with_affine,
+        rect_bounds_to_corners,
+        homography_from_4pts,
+    )
+    from utils.tps import apply_tps_to_gdf
     from data_processing import _get_region_shapefile_path, _get_region_outline_path, BASE_DIR
 except ImportError:
-    from backend.utils.geo_align import fit_gdf_to_bbox_pixels, fit_with_autoinset
-    from backend.utils.homography import transform_gdf_with_homography, rect_bounds_to_corners
+    from backend.utils.geo_align import (
+        fit_gdf_to_bbox_pixels,
+        fit_with_autoinset,
+        refine_alignment_with_edge_matching,
+    )
+    from backend.utils.homography import (
+        transform_gdf_with_homography,
+        transform_gdf_with_matrix,
+        transform_gdf_with_affine,
+        rect_bounds_to_corners,
+        homography_from_4pts,
+    )
+    from backend.utils.tps import apply_tps_to_gdf
     from backend.data_processing import _get_region_shapefile_path, _get_region_outline_path, BASE_DIR
 
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+# Debug-level by default: enable with logging.basicConfig(level=logging.DEBUG)
+# when diagnosing alignment issues; %-style args keep disabled records free
+logger = logging.getLogger(__name__)
+
+# Rough geographic extents (lon/lat) per region, used to pre-filter the
+# generic fallback shapefile with the spatial index so only the relevant
+# counties flow through reprojection, boundary extraction and alignment
+_REGION_GEO_BBOX = {
+    "conus": (-125.0, 24.0, -66.0, 50.0),
+    "alaska": (-180.0, 50.0, -128.0, 72.0),
+    "hawaii": (-161.0, 18.0, -154.0, 23.0),
+}
+
+
+# Decoded BGR frames keyed by (path, mtime_ns). Interactive previews
+# re-render the same upload dozens of times as the user drags rect4, and
+# PNG decode dominates the per-call fixed cost; the mtime key drops stale
+# entries when an upload is overwritten
+_IMAGE_CACHE: Dict[Tuple[str, int], np.ndarray] = {}
+_IMAGE_CACHE_MAX = 4
+
+
+def _load_image_bgr(image_path: str) -> np.ndarray:
+    """
+    Decode an image to a writable BGR array, caching the decoded pixels.
+
+    The cached array is kept pristine; each call gets a fresh copy to draw
+    on, so repeat previews of the same image pay one memcpy instead of a
+    full PNG decode.
+    """
+    key = (image_path, os.stat(image_path).st_mtime_ns)
+    cached = _IMAGE_CACHE.get(key)
+    if cached is None:
+        cached = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if cached is None:
+            raise FileNotFoundError(f"Could not read image: {image_path}")
+        if len(_IMAGE_CACHE) >= _IMAGE_CACHE_MAX:
+            _IMAGE_CACHE.pop(next(iter(_IMAGE_CACHE)))
+        _IMAGE_CACHE[key] = cached
+    return cached.copy()
+
+
+def _wanted_columns(path: str) -> List[str]:
+    """Attribute columns to request from a read: GEOID when the file has it.
+
+    pyogrio (geopandas' default engine) skips the other attribute columns at
+    the GDAL level instead of loading and dropping them afterwards.
+    """
+    try:
+        fields = pyogrio.read_info(path).get("fields")
+    except Exception:
+        return None  # let read_file load everything
+    if fields is not None and "GEOID" in fields:
+        return ["GEOID"]
+    return []
+
+
+def _boundary_polylines(geoms: np.ndarray) -> List[np.ndarray]:
+    """
+    Flatten a geometry array into int32 polyline arrays for cv2.polylines.
+
+    Missing/empty members are screened in one vectorized pass; polygon rings
+    (exterior and interiors) and multi-part members are unrolled so a single
+    batched cv2.polylines call can burn all of them.
+    """
+    polylines = []
+    valid = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+    for geom in geoms[valid]:
+        parts = geom.geoms if geom.geom_type.startswith("Multi") else [geom]
+        for part in parts:
+            if part.geom_type == "Polygon":
+                rings = [part.exterior, *part.interiors]
+            else:
+                rings = [part]
+            for ring in rings:
+                coords = np.round(np.asarray(ring.coords)).astype(np.int32)
+                if len(coords) >= 2:
+                    polylines.append(coords)
+    return polylines
+
+
+@lru_cache(maxsize=16)
+def _load_region_outline(region: str, projection: str) -> gpd.GeoDataFrame:
+    """
+    Load a region's outline shapefile (falling back to boundary-extracted
+    county polygons), fill GEOID and reproject to EPSG:5070.
+
+    Cached per (region, projection): the outline files are static, so
+    repeated overlay renders skip the disk read and the per-vertex PROJ
+    reprojection. The returned frame is shared - callers must not mutate it.
+    """
+    outline_path = _get_region_outline_path(region=region, projection=projection)
+
+    if os.path.exists(outline_path):
+        shp = gpd.read_file(outline_path, columns=_wanted_columns(outline_path))
+    else:
+        shapefile_path = _get_region_shapefile_path(region=region, projection=projection)
+        if not os.path.exists(shapefile_path):
+            # Fallback: region shapefile without projection suffix
+            fallback_path = os.path.join(
+                BASE_DIR, f"cb_2024_us_county_500k_{region}", f"cb_2024_us_county_500k_{region}.shp"
+            )
+            if os.path.exists(fallback_path):
+                shapefile_path = fallback_path
+            else:
+                # Last resort: the default (CONUS-only) shapefile
+                try:
+                    from data_processing import SHAPEFILE_PATH
+                except ImportError:
+                    from backend.data_processing import SHAPEFILE_PATH
+                shapefile_path = SHAPEFILE_PATH
+        if not os.path.exists(shapefile_path):
+            raise FileNotFoundError(f"No outline or shapefile found for region '{region}'")
+        # The generic file covers more than the requested region - push the
+        # region's rough lon/lat bbox down into the OGR read so the extra
+        # counties are never deserialized at all (the CRS check uses the
+        # file metadata only, no feature read)
+        geo_bbox = _REGION_GEO_BBOX.get(region)
+        read_bbox = None
+        if geo_bbox is not None:
+            file_crs = pyogrio.read_info(shapefile_path).get("crs")
+            if file_crs is None or CRS(file_crs).is_geographic:
+                read_bbox = geo_bbox
+        shp = gpd.read_file(
+            shapefile_path, columns=_wanted_columns(shapefile_path), bbox=read_bbox
+        )
+        if len(shp) == 0 and read_bbox is not None:
+            # Bbox guess missed every feature - fall back to a full read
+            shp = gpd.read_file(shapefile_path, columns=_wanted_columns(shapefile_path))
+        # Extract boundary linework from the polygons
+        shp["geometry"] = shp.geometry.boundary
+
+    if "GEOID" not in shp.columns:
+        shp["GEOID"] = shp.index.astype(str)
+    shp["GEOID"] = shp["GEOID"].astype(str).str.zfill(5)
+
+    # Only GEOID and the linework are consumed downstream - drop the rest of
+    # the attribute table so the cached frame stays small
+    shp = shp[["GEOID", "geometry"]]
+
+    # Ensure CRS is set, then reproject to EPSG:5070 for alignment
+    if shp.crs is None:
+        if projection == "4326":
+            shp = shp.set_crs(4326, allow_override=True)
+        elif projection == "5070":
+            shp = shp.set_crs(5070, allow_override=True)
+        else:
+            shp = shp.set_crs(4269, allow_override=True)
+    if shp.crs.to_epsg() != 5070:
+        shp = shp.to_crs(5070)
+
+    # total_bounds scans every geometry's envelope; precompute it once here
+    # so hot paths read a tuple off the cached frame instead
+    shp.attrs["total_bounds_5070"] = tuple(shp.total_bounds)
+
+    return shp
+
 
 def generate_region_overlay_preview(
     image_path: str,
@@ -59,25 +241,24 @@ def generate_region_overlay_preview(
         output_path = os.path.join(output_dir, f"{upload_id}_preview_overlay.png")
     
     # Load image at natural size - NEVER resize
-    # Image.open() loads at original dimensions, convert() only changes color space
-    img_pil = Image.open(image_path).convert("RGB")
-    W, H = img_pil.size  # Natural dimensions from file (width, height)
+    # Decoded BGR pixels are cached per (path, mtime), so re-rendering the
+    # same upload costs a memcpy instead of a PNG decode; everything
+    # downstream works in cv2's BGR channel order
+    overlay = _load_image_bgr(image_path)
+    H, W = overlay.shape[:2]  # Natural dimensions from file
     img_width, img_height = W, H
     
-    # Convert to numpy array for rasterization (no resize, exact pixel grid)
-    overlay = np.array(img_pil)
-    
-    print(f"\n🔍 OVERLAY PREVIEW DEBUG:")
-    print(f"  Image file: {image_path}")
-    print(f"  Image dimensions (natural): {W} x {H} pixels")
-    print(f"  Projection: EPSG:{projection}")
-    print(f"  CONUS bbox: {bounds_bbox}")
-    print(f"  CONUS rect4: {bounds_rect4}")
+    logger.debug("🔍 OVERLAY PREVIEW DEBUG:")
+    logger.debug("  Image file: %s", image_path)
+    logger.debug("  Image dimensions (natural): %s x %s pixels", W, H)
+    logger.debug("  Projection: EPSG:%s", projection)
+    logger.debug("  CONUS bbox: %s", bounds_bbox)
+    logger.debug("  CONUS rect4: %s", bounds_rect4)
     
     # Verify image dimensions match bounds expectation
     x0, y0, x1, y1 = bounds_bbox
     if x1 > W or y1 > H:
-        print(f"  ⚠️  WARNING: Bbox extends beyond image: bbox max ({x1}, {y1}) vs image ({W}, {H})")
+        logger.debug("  ⚠️  WARNING: Bbox extends beyond image: bbox max (%s, %s) vs image (%s, %s)", x1, y1, W, H)
     
     # Load and align regions
     # CONUS is always loaded - uses CONUS-only shapefile (no Alaska/Hawaii)
@@ -87,91 +268,31 @@ def generate_region_overlay_preview(
     if has_hawaii:
         regions_to_load.append("hawaii")
     
-    print(f"\n📋 Regions to load: {regions_to_load}")
-    print(f"   ✓ CONUS will use CONUS-only shapefile (excludes Alaska/Hawaii)")
+    logger.debug("📋 Regions to load: %s", regions_to_load)
+    logger.debug("   ✓ CONUS will use CONUS-only shapefile (excludes Alaska/Hawaii)")
     
     x0, y0, x1, y1 = bounds_bbox
-    
-    for region in regions_to_load:
-        # Load region OUTLINE shapefile (linework only, not full polygons)
-        outline_path = _get_region_outline_path(region=region, projection=projection)
-        
-        print(f"\n📂 Loading {region.upper()} outline shapefile:")
-        print(f"    Projection: EPSG:{projection}")
-        print(f"    Outline path: {outline_path}")
-        
-        if not os.path.exists(outline_path):
-            print(f"    ⚠️  Outline not found: {outline_path}")
-            print(f"     Falling back to full shapefile (will create mesh effect)")
-            # Fallback to full shapefile if outline doesn't exist
-            shapefile_path = _get_region_shapefile_path(region=region, projection=projection)
-        
-        if not os.path.exists(shapefile_path):
-            if region == "conus":
-                    # Fallback: Try CONUS-only shapefile without projection suffix
-                    fallback_conus_path = os.path.join(BASE_DIR, "cb_2024_us_county_500k_conus", "cb_2024_us_county_500k_conus.shp")
-                    if os.path.exists(fallback_conus_path):
-                        shapefile_path = fallback_conus_path
-                        print(f"    Using CONUS-only fallback shapefile (no Alaska/Hawaii)")
-                    else:
-                        # Last resort: use SHAPEFILE_PATH (should also be CONUS-only)
-                        try:
-                            from data_processing import SHAPEFILE_PATH
-                        except ImportError:
-                            from backend.data_processing import SHAPEFILE_PATH
-                        shapefile_path = SHAPEFILE_PATH
-                        print(f"    Using CONUS-only shapefile from SHAPEFILE_PATH")
-            else:
-                continue  # Skip if shapefile doesn't exist
-        
-            print(f"    Using shapefile: {shapefile_path}")
-            print(f"    ✓ This is a {region.upper()}-ONLY shapefile (does NOT include other regions)")
-            shp = gpd.read_file(shapefile_path)
-            
-            # Verify this is CONUS-only (check bounds don't include Alaska/Hawaii)
-            if region == "conus":
-                bounds = shp.total_bounds
-                # CONUS bounds should be roughly: -125 to -66 longitude, 24 to 50 latitude
-                # Alaska is much further west/north, Hawaii is much further west
-                if bounds[0] < -180 or bounds[2] > -60:  # If extends too far west/east
-                    print(f"    ⚠️  WARNING: Shapefile bounds extend beyond CONUS: {bounds}")
-                else:
-                    print(f"    ✓ Verified: Shapefile bounds are CONUS-only: {bounds}")
-            
-            # Extract boundary from polygons
-            shp["geometry"] = shp.geometry.boundary
-        else:
-            # Use outline shapefile directly
-            print(f"    ✓ Found outline shapefile")
-            print(f"    ✓ This is a {region.upper()}-ONLY outline (does NOT include other regions)")
-            shp = gpd.read_file(outline_path)
-            
-            # Verify this is CONUS-only outline
-            if region == "conus":
-                bounds = shp.total_bounds
-                if bounds[0] < -180 or bounds[2] > -60:
-                    print(f"    ⚠️  WARNING: Outline bounds extend beyond CONUS: {bounds}")
-                else:
-                    print(f"    ✓ Verified: Outline bounds are CONUS-only: {bounds}")
-        
-        if "GEOID" not in shp.columns:
-            shp["GEOID"] = shp.index.astype(str)
-        shp["GEOID"] = shp["GEOID"].astype(str).str.zfill(5)
-        
-        # Ensure CRS is set
-        if shp.crs is None:
-            if projection == "4326":
-                shp = shp.set_crs(4326, allow_override=True)
-            elif projection == "5070":
-                shp = shp.set_crs(5070, allow_override=True)
-            else:
-                shp = shp.set_crs(4269, allow_override=True)
-        
-        # Reproject to EPSG:5070 for alignment
-        target_crs = 5070
-        if shp.crs.to_epsg() != target_crs:
-            shp = shp.to_crs(target_crs)
-        
+
+    def _prepare_region(region):
+        """
+        Load, align and transform one region's linework; returns the list of
+        int32 polyline arrays to draw (empty when the region is skipped).
+        Only reads from the shared overlay array - drawing happens later on
+        the main thread.
+        """
+        # Load region OUTLINE shapefile (linework only, not full polygons) -
+        # cached and already reprojected to EPSG:5070
+        logger.debug("📂 Loading %s outline shapefile:", region.upper())
+        logger.debug("    Projection: EPSG:%s", projection)
+
+        try:
+            shp = _load_region_outline(region, projection)
+        except FileNotFoundError as load_err:
+            logger.debug("    ⚠️  %s - skipping region", load_err)
+            return [], None
+
+        logger.debug("    ✓ Loaded %s-only outline (%s features)", region.upper(), len(shp))
+
         # Determine rect4 and bbox for this region
         if region == "conus":
             # Use user-selected CONUS if available, otherwise use bounds
@@ -190,17 +311,17 @@ def generate_region_overlay_preview(
                 else:
                     region_rect4 = [(conus_x0, conus_y0), (conus_x1, conus_y0), (conus_x1, conus_y1), (conus_x0, conus_y1)]
                 region_polygon = None
-                print(f"    Using user-selected CONUS region")
+                logger.debug("    Using user-selected CONUS region")
             else:
                 region_bbox = bounds_bbox
                 region_polygon = bounds_polygon
                 region_rect4 = bounds_rect4  # Use rect4 if provided
-                print(f"    Using detected CONUS bounds")
+                logger.debug("    Using detected CONUS bounds")
             color = (255, 0, 0, 255)  # Red for CONUS
         elif region == "alaska":
             if not region_selections or not region_selections.get("alaska"):
-                print(f"    ⚠️  Alaska region selection not found, skipping...")
-                continue
+                logger.debug("    ⚠️  Alaska region selection not found, skipping...")
+                return [], None
             alaska_bbox = region_selections["alaska"]
             ak_x0 = int(alaska_bbox["x"])
             ak_y0 = int(alaska_bbox["y"])
@@ -217,11 +338,11 @@ def generate_region_overlay_preview(
                 region_rect4 = [(ak_x0, ak_y0), (ak_x1, ak_y0), (ak_x1, ak_y1), (ak_x0, ak_y1)]
             region_polygon = None
             color = (0, 255, 0, 255)  # Green for Alaska
-            print(f"    Alaska bbox: {region_bbox}, rect4: {region_rect4}")
+            logger.debug("    Alaska bbox: %s, rect4: %s", region_bbox, region_rect4)
         elif region == "hawaii":
             if not region_selections or not region_selections.get("hawaii"):
-                print(f"    ⚠️  Hawaii region selection not found, skipping...")
-                continue
+                logger.debug("    ⚠️  Hawaii region selection not found, skipping...")
+                return [], None
             hawaii_bbox = region_selections["hawaii"]
             hi_x0 = int(hawaii_bbox["x"])
             hi_y0 = int(hawaii_bbox["y"])
@@ -238,11 +359,11 @@ def generate_region_overlay_preview(
                 region_rect4 = [(hi_x0, hi_y0), (hi_x1, hi_y0), (hi_x1, hi_y1), (hi_x0, hi_y1)]
             region_polygon = None
             color = (0, 0, 255, 255)  # Blue for Hawaii
-            print(f"    Hawaii bbox: {region_bbox}, rect4: {region_rect4}")
+            logger.debug("    Hawaii bbox: %s, rect4: %s", region_bbox, region_rect4)
         
         # Use rect4-based affine transformation with edge detection alignment
         if region_rect4 and len(region_rect4) == 4:
-            print(f"  {region.upper()} alignment (using edge detection + affine transform):")
+            logger.debug("  %s alignment (using edge detection + affine transform):", region.upper())
             
             # Extract rect4 dimensions (NOT whole image dimensions)
             (x1, y1), (x2, y2) = region_rect4[0], region_rect4[2]  # Top-left, Bottom-right
@@ -258,44 +379,52 @@ def generate_region_overlay_preview(
                 f"Rect suspiciously small: W={W_rect}, H={H_rect} (minimum {min_size}px for {region})"
             
             # Step 1: Crop the region from the full image
-            print(f"    Step 1: Cropping {region.upper()} region from image...")
-            cropped_img = overlay[y1:y2, x1:x2].copy()  # Crop region (numpy array)
+            logger.debug("    Step 1: Cropping %s region from image...", region.upper())
+            # Edge detection only reads the crop, so a view into the overlay
+            # is enough - no per-region memcpy
+            cropped_img = overlay[y1:y2, x1:x2]
             cropped_h, cropped_w = cropped_img.shape[:2]
-            print(f"      Cropped size: {cropped_w} x {cropped_h} pixels")
+            logger.debug("      Cropped size: %s x %s pixels", cropped_w, cropped_h)
             
             # Step 2: Get shapefile bounds in its native CRS (should be EPSG:5070 after reprojection)
-            xmin, ymin, xmax, ymax = shp.total_bounds  # [xmin, ymin, xmax, ymax]
+            xmin, ymin, xmax, ymax = shp.attrs["total_bounds_5070"]  # [xmin, ymin, xmax, ymax]
             
-            print(f"    Step 2: Preparing alignment for cropped {region.upper()} region...")
-            print(f"      Shapefile bounds: ({xmin:.2f}, {ymin:.2f}) to ({xmax:.2f}, {ymax:.2f})")
-            print(f"      Shapefile size: {(xmax-xmin):.2f} x {(ymax-ymin):.2f}")
-            print(f"      Cropped image size: {cropped_w} x {cropped_h} pixels")
+            logger.debug("    Step 2: Preparing alignment for cropped %s region...", region.upper())
+            logger.debug("      Shapefile bounds: (%.2f, %.2f) to (%.2f, %.2f)", xmin, ymin, xmax, ymax)
+            logger.debug("      Shapefile size: %.2f x %.2f", (xmax-xmin), (ymax-ymin))
+            logger.debug("      Cropped image size: %s x %s pixels", cropped_w, cropped_h)
             
             # Step 3: Use edge detection on cropped image and refine alignment with rotation
-            print(f"    Step 3: Edge detection + affine transformation + rotation on cropped {region.upper()} image...")
-            try:
-                from backend.utils.geo_align import refine_alignment_with_edge_matching, fit_with_autoinset
-            except:
-                from utils.geo_align import refine_alignment_with_edge_matching, fit_with_autoinset
-            
-            # Create a temporary image file for the cropped region (required by edge detection)
-            import tempfile
-            temp_cropped_path = os.path.join(BASE_DIR, "data", f"{upload_id}_temp_{region}_cropped.png")
-            os.makedirs(os.path.dirname(temp_cropped_path), exist_ok=True)
-            Image.fromarray(cropped_img).save(temp_cropped_path)
-            
+            logger.debug("    Step 3: Edge detection + affine transformation + rotation on cropped %s image...", region.upper())
+
+            # Edge detection consumes the cropped pixels directly (already
+            # BGR from cv2.imread) - no temp-PNG encode/decode round trip.
+            # Coarse-to-fine: edge locations are robust to 2-4x downsampling,
+            # and the alignment search cost scales with pixel count, so run it
+            # on a <=1024px working copy and scale the solution back up
+            ds = max(1, int(max(cropped_w, cropped_h) / 1024))
+            if ds > 1:
+                cropped_bgr = cv2.resize(
+                    cropped_img, (cropped_w // ds, cropped_h // ds),
+                    interpolation=cv2.INTER_AREA,
+                )
+                logger.debug("      Downsampled %sx for alignment: %s x %s",
+                             ds, cropped_bgr.shape[1], cropped_bgr.shape[0])
+            else:
+                cropped_bgr = cropped_img
+
             # Try using fit_with_autoinset first for better initial alignment
-            cropped_bbox = (0, 0, cropped_w, cropped_h)
+            # (bbox in working-copy resolution)
+            cropped_bbox = (0, 0, cropped_bgr.shape[1], cropped_bgr.shape[0])
             
             # For Alaska/Hawaii, use smaller inset candidates since they're small inset maps
             # Also use keep_aspect=False for Alaska/Hawaii since they may have different aspect ratios
             inset_candidates = (1, 2, 3, 4) if region.lower() in ("alaska", "hawaii") else (4, 6, 8, 10)
             use_keep_aspect = region.lower() not in ("alaska", "hawaii")  # Don't keep aspect for insets
             
-            print(f"      Cropped image saved to: {temp_cropped_path}")
-            print(f"      Cropped bbox: {cropped_bbox}")
-            print(f"      Shapefile bounds: ({xmin:.2f}, {ymin:.2f}) to ({xmax:.2f}, {ymax:.2f})")
-            print(f"      Aspect ratio - Shapefile: {(xmax-xmin)/(ymax-ymin):.3f}, Cropped: {cropped_w/cropped_h:.3f}")
+            logger.debug("      Cropped bbox: %s", cropped_bbox)
+            logger.debug("      Shapefile bounds: (%.2f, %.2f) to (%.2f, %.2f)", xmin, ymin, xmax, ymax)
+            logger.debug("      Aspect ratio - Shapefile: %.3f, Cropped: %.3f", (xmax-xmin)/(ymax-ymin), cropped_w/cropped_h)
             
             # Initialize gdf_cropped variable
             # NOTE: User's box is just a rough guide - we'll use edge detection to find perfect alignment
@@ -304,12 +433,8 @@ def generate_region_overlay_preview(
             
             # Quick initial alignment - just to get shapefile roughly in the right area
             # This is just a starting point, edge detection will do the real work
-            print(f"      Step 3a: Quick initial alignment (user's box is rough guide only)...")
-            try:
-                from backend.utils.geo_align import fit_gdf_to_bbox_pixels
-            except:
-                from utils.geo_align import fit_gdf_to_bbox_pixels
-            
+            logger.debug("      Step 3a: Quick initial alignment (user's box is rough guide only)...")
+
             # Use a simple fit - don't worry about perfect initial alignment
             # Edge detection will find the perfect match regardless
             initial_inset = 2 if region.lower() in ("alaska", "hawaii") else 5
@@ -320,20 +445,20 @@ def generate_region_overlay_preview(
                 keep_aspect=False,  # Don't constrain aspect - let edge detection handle it
                 inset_px=initial_inset
             )
-            print(f"      ✓ Initial rough alignment complete (inset={initial_inset}px)")
-            print(f"      Initial bounds: {gdf_cropped.total_bounds}")
-            print(f"      NOTE: This is just a starting point - edge detection will find perfect alignment")
+            logger.debug("      ✓ Initial rough alignment complete (inset=%spx)", initial_inset)
+            logger.debug("      Initial bounds: %s", gdf_cropped.total_bounds)
+            logger.debug("      NOTE: This is just a starting point - edge detection will find perfect alignment")
             
             # Step 3b: PERFECT ALIGNMENT using edge detection - this is where the real work happens
             # Edge detection finds the ACTUAL borders in the image, then we align shapefile to match
             # This works regardless of how accurate the user's box was
             is_alaska_hawaii = region.lower() in ("alaska", "hawaii")
             try:
-                print(f"      Step 3b: PERFECT ALIGNMENT using edge detection...")
-                print(f"      🔍 Detecting county borders from color changes in image...")
-                print(f"      🎯 Aligning shapefile to match detected borders (100% automatic)...")
+                logger.debug("      Step 3b: PERFECT ALIGNMENT using edge detection...")
+                logger.debug("      🔍 Detecting county borders from color changes in image...")
+                logger.debug("      🎯 Aligning shapefile to match detected borders (100%% automatic)...")
                 if is_alaska_hawaii:
-                    print(f"      🔄 Using FULL ±180° rotation search for {region.upper()}...")
+                    logger.debug("      🔄 Using FULL ±180° rotation search for %s...", region.upper())
                 
                 # This function does ALL the work:
                 # 1. Detects borders from color changes in the image
@@ -341,81 +466,72 @@ def generate_region_overlay_preview(
                 # 3. Finds the perfect alignment regardless of user's box accuracy
                 gdf_cropped_refined = refine_alignment_with_edge_matching(
                     gdf_cropped,
-                    image_path=temp_cropped_path,
+                    image_array=cropped_bgr,
                     bbox=cropped_bbox,
                     max_iterations=5,
                     is_alaska_hawaii=is_alaska_hawaii
                 )
-                print(f"      ✓✓✓ PERFECT ALIGNMENT COMPLETE ✓✓✓")
-                print(f"      Shapefile borders now match detected image borders")
-                print(f"      Final bounds: {gdf_cropped_refined.total_bounds}")
+                logger.debug("      ✓✓✓ PERFECT ALIGNMENT COMPLETE ✓✓✓")
+                logger.debug("      Shapefile borders now match detected image borders")
+                logger.debug("      Final bounds: %s", gdf_cropped_refined.total_bounds)
                 gdf_cropped = gdf_cropped_refined
             except Exception as refine_err:
-                print(f"      ⚠️  Edge-based alignment failed: {refine_err}")
+                logger.debug("      ⚠️  Edge-based alignment failed: %s", refine_err)
                 import traceback
                 traceback.print_exc()
-                print(f"      Using initial alignment (may not be perfect)")
-            
-            # Clean up temp file
-            try:
-                os.remove(temp_cropped_path)
-            except:
-                pass
-            
-            # Step 5: Transform back to full image coordinates
-            print(f"    Step 4: Transforming back to full image coordinates...")
-            # Translate from cropped coordinates (0,0 origin) to full image coordinates
-            A_translate = [1, 0, 0, 1, x1, y1]  # Translate by (x1, y1)
-            
-            gdf_px = gdf_cropped.copy()
-            gdf_px["geometry"] = gdf_px.geometry.apply(
-                lambda geom: affine_transform(geom, A_translate)
-            )
-            
-            print(f"      Final aligned bounds (full image coords): {gdf_px.total_bounds}")
-            
-            # Step 6: Rasterize into exact image grid (H, W) - zero resizing
-            print(f"    Step 5: Rasterizing shapefile edges...")
-            geometries_for_raster = []
-            for geom in gdf_px.geometry:
-                if geom is None or geom.is_empty:
-                    continue
-                if geom.geom_type in ("LineString", "MultiLineString"):
-                    # Buffer linework to create solid lines (1 pixel width for visible border)
-                    geom_buffered = geom.buffer(1.0)
-                    if not geom_buffered.is_empty:
-                        geometries_for_raster.append(geom_buffered)
-                else:
-                    # Already a polygon
-                    geometries_for_raster.append(geom)
-            
-            if geometries_for_raster:
-                # Rasterize into (H, W) - exact image grid, no resizing
-                mask = rasterize(
-                    [(geom, 1) for geom in geometries_for_raster],
-                    out_shape=(H, W),  # (height, width) for numpy array
-                    transform=Affine.identity(),  # No transform, already in pixel coords
-                    fill=0,
-                    dtype="uint8"
-                )
-                
-                # Draw solid red border directly from mask (no Canny edge detection)
-                # Red color: [255, 0, 0] for pure red solid border
-                overlay[mask > 0] = [255, 0, 0]
-                
-                print(f"    ✓ Rasterized and drew solid red borders for {region.upper()}")
-            else:
-                print(f"    ⚠️  No valid geometries to rasterize for {region.upper()}")
+                logger.debug("      Using initial alignment (may not be perfect)")
+
+            # Scale the fitted geometry from the working-copy resolution back
+            # up to the full-resolution crop
+            if ds > 1:
+                geoms = gdf_cropped.geometry.values
+                coords = shapely.get_coordinates(geoms) * ds
+                gdf_cropped = gdf_cropped.copy(deep=False)
+                gdf_cropped["geometry"] = shapely.set_coordinates(geoms.copy(), coords)
+
+            # Step 5: Draw all boundary linework in ONE batched cv2.polylines
+            # call on the exact image grid - no per-line buffer()/rasterize.
+            # Polylines stay in crop-local coordinates: drawing happens in
+            # the regional sub-window, so the translate-back to full-image
+            # coordinates is gone entirely
+            logger.debug("    Step 4: Building crop-local polylines...")
+            polylines = _boundary_polylines(gdf_cropped.geometry.values)
+
+            return polylines, (x1, y1, x2, y2)
         else:
             # Fallback: rect4 not available, skip this region
-            print(f"  {region.upper()} skipped (rect4 not available)")
-    
+            logger.debug("  %s skipped (rect4 not available)", region.upper())
+            return [], None
+
+    # Regions are independent until the final draw (GEOS/NumPy/OpenCV release
+    # the GIL), so prepare them concurrently and serialize only the drawing
+    if len(regions_to_load) > 1:
+        with ThreadPoolExecutor(max_workers=len(regions_to_load)) as pool:
+            region_results = list(pool.map(_prepare_region, regions_to_load))
+    else:
+        region_results = [_prepare_region(regions_to_load[0])]
+
+    for region, (polylines, rect) in zip(regions_to_load, region_results):
+        if polylines:
+            # Solid red border (BGR), 2 px wide (matches the old buffer(1.0)
+            # mask). Draw on a contiguous copy of the sub-window and blit it
+            # back - cv2 cannot write into a strided view, and the copy is
+            # crop-sized rather than full-image
+            rx1, ry1, rx2, ry2 = rect
+            sub = np.ascontiguousarray(overlay[ry1:ry2, rx1:rx2])
+            cv2.polylines(sub, polylines, isClosed=False,
+                          color=(0, 0, 255), thickness=2)
+            overlay[ry1:ry2, rx1:rx2] = sub
+            logger.debug("    ✓ Drew solid red borders for %s (%s polylines)", region.upper(), len(polylines))
+        else:
+            logger.debug("    ⚠️  No valid geometries to rasterize for %s", region.upper())
+
     # Save overlay at natural image size - NEVER resize
-    # Convert numpy array back to PIL Image and save at exact dimensions
-    print(f"\n💾 Saving overlay to: {output_path}")
-    result_img = Image.fromarray(overlay)
-    result_img.save(output_path)  # Saves at exact (W, H) dimensions
-    print(f"  ✓ Overlay saved successfully at natural size: {W}x{H}")
+    # PNG compression level 1 encodes several times faster than the default 6
+    # for a modest file-size cost - fine for throwaway previews
+    logger.debug("💾 Saving overlay to: %s", output_path)
+    cv2.imwrite(output_path, overlay, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    logger.debug("  ✓ Overlay saved successfully at natural size: %sx%s", W, H)
     return output_path
 
 
@@ -446,53 +562,15 @@ def generate_conus_interactive_overlay(
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, f"{upload_id}_conus_interactive_overlay.png")
     
-    # Load image at natural size
-    img_pil = Image.open(image_path).convert("RGB")
-    W, img_height = img_pil.size  # Use img_height to avoid conflict with homography H
-    overlay = np.array(img_pil)
-    
-    # Load CONUS outline shapefile
-    outline_path = _get_region_outline_path(region="conus", projection=projection)
-    
-    if not os.path.exists(outline_path):
-        # Fallback to full shapefile
-        shapefile_path = _get_region_shapefile_path(region="conus", projection=projection)
-        if not os.path.exists(shapefile_path):
-            fallback_conus_path = os.path.join(BASE_DIR, "cb_2024_us_county_500k_conus", "cb_2024_us_county_500k_conus.shp")
-            if os.path.exists(fallback_conus_path):
-                shapefile_path = fallback_conus_path
-            else:
-                try:
-                    from data_processing import SHAPEFILE_PATH
-                except ImportError:
-                    from backend.data_processing import SHAPEFILE_PATH
-                shapefile_path = SHAPEFILE_PATH
-        shp = gpd.read_file(shapefile_path)
-        shp["geometry"] = shp.geometry.boundary
-    else:
-        shp = gpd.read_file(outline_path)
-    
-    # Ensure GEOID column exists
-    if "GEOID" not in shp.columns:
-        shp["GEOID"] = shp.index.astype(str)
-    shp["GEOID"] = shp["GEOID"].astype(str).str.zfill(5)
-    
-    # Set CRS if missing
-    if shp.crs is None:
-        if projection == "4326":
-            shp = shp.set_crs(4326, allow_override=True)
-        elif projection == "5070":
-            shp = shp.set_crs(5070, allow_override=True)
-        else:
-            shp = shp.set_crs(4269, allow_override=True)
-    
-    # Reproject to EPSG:5070 for consistent transformation
-    target_crs = 5070
-    if shp.crs.to_epsg() != target_crs:
-        shp = shp.to_crs(target_crs)
+    # Load image at natural size - decoded BGR pixels cached per (path, mtime)
+    overlay = _load_image_bgr(image_path)
+    img_height, W = overlay.shape[:2]  # img_height avoids conflict with homography H
     
+    # Load CONUS outline shapefile - cached and already reprojected to 5070
+    shp = _load_region_outline("conus", projection)
+
     # Get shapefile bounds (source corners in geographic/projected coordinates)
-    xmin, ymin, xmax, ymax = shp.total_bounds
+    xmin, ymin, xmax, ymax = shp.attrs["total_bounds_5070"]
     src_bounds = (xmin, ymin, xmax, ymax)
     
     # Convert shapefile bounds to 4 corners (clockwise: TL, TR, BR, BL)
@@ -503,58 +581,34 @@ def generate_conus_interactive_overlay(
     dst4 = np.array(conus_rect4, dtype=float)
     
     # Compute homography matrix
-    try:
-        from utils.homography import homography_from_4pts, apply_homography_to_geometry
-    except ImportError:
-        from backend.utils.homography import homography_from_4pts, apply_homography_to_geometry
-    
     H = homography_from_4pts(src4, dst4)
     
-    print(f"\n🔧 INTERACTIVE OVERLAY TRANSFORMATION:")
-    print(f"  Source corners (shapefile bounds): {src4}")
-    print(f"  Destination corners (user-dragged rect4): {dst4}")
-    print(f"  Homography matrix H:")
-    print(f"    {H[0]}")
-    print(f"    {H[1]}")
-    print(f"    {H[2]}")
-    
-    # Apply homography to all geometries
-    gdf_px = shp.copy()
-    gdf_px["geometry"] = gdf_px.geometry.apply(
-        lambda geom: apply_homography_to_geometry(geom, H)
-    )
-    gdf_px.crs = None
+    logger.debug("🔧 INTERACTIVE OVERLAY TRANSFORMATION:")
+    logger.debug("  Source corners (shapefile bounds): %s", src4)
+    logger.debug("  Destination corners (user-dragged rect4): %s", dst4)
+    logger.debug("  Homography matrix H:")
+    logger.debug("    %s", H[0])
+    logger.debug("    %s", H[1])
+    logger.debug("    %s", H[2])
     
+    # Apply homography to all geometries in one whole-frame pass
+    gdf_px = transform_gdf_with_matrix(shp, H)
+
     # Debug: Check transformed bounds
     transformed_bounds = gdf_px.total_bounds
-    print(f"  Transformed shapefile bounds: {transformed_bounds}")
-    print(f"  Expected destination bounds: [{dst4[0][0]}, {dst4[2][1]}, {dst4[2][0]}, {dst4[0][1]}]")
-    
-    # Rasterize
-    geometries_for_raster = []
-    for geom in gdf_px.geometry:
-        if geom is None or geom.is_empty:
-            continue
-        if geom.geom_type in ("LineString", "MultiLineString"):
-            geom_buffered = geom.buffer(1.0)
-            if not geom_buffered.is_empty:
-                geometries_for_raster.append(geom_buffered)
-        else:
-            geometries_for_raster.append(geom)
-    
-    if geometries_for_raster:
-        mask = rasterize(
-            [(geom, 1) for geom in geometries_for_raster],
-            out_shape=(img_height, W),  # Use img_height instead of H
-            transform=Affine.identity(),
-            fill=0,
-            dtype="uint8"
-        )
-        overlay[mask > 0] = [255, 0, 0]  # Red border
-    
-    # Save overlay
-    result_img = Image.fromarray(overlay)
-    result_img.save(output_path)
+    logger.debug("  Transformed shapefile bounds: %s", transformed_bounds)
+    logger.debug("  Expected destination bounds: [%s, %s, %s, %s]", dst4[0][0], dst4[2][1], dst4[2][0], dst4[0][1])
+    
+    # Burn the linework with one batched cv2.polylines call - a GDAL-free
+    # C rasterizer with no per-call mask allocation, matching the region
+    # preview's draw path
+    polylines = _boundary_polylines(gdf_px.geometry.values)
+    if polylines:
+        cv2.polylines(overlay, polylines, isClosed=False,
+                      color=(0, 0, 255), thickness=2)  # Red border (BGR)
+    
+    # Save overlay (fast PNG encode - previews are throwaway artifacts)
+    cv2.imwrite(output_path, overlay, [cv2.IMWRITE_PNG_COMPRESSION, 1])
     return output_path
 
 
@@ -587,132 +641,56 @@ def generate_alaska_interactive_overlay(
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, f"{upload_id}_alaska_interactive_overlay.png")
     
-    # Load image at natural size
-    img_pil = Image.open(image_path).convert("RGB")
-    W, img_height = img_pil.size  # Use img_height to avoid conflict with homography H
-    overlay = np.array(img_pil)
-    
-    # Load Alaska outline shapefile
-    outline_path = _get_region_outline_path(region="alaska", projection=projection)
-    
-    if not os.path.exists(outline_path):
-        # Fallback to full shapefile
-        shapefile_path = _get_region_shapefile_path(region="alaska", projection=projection)
-        if not os.path.exists(shapefile_path):
-            fallback_alaska_path = os.path.join(BASE_DIR, "cb_2024_us_county_500k_alaska", f"cb_2024_us_county_500k_alaska.shp")
-            if os.path.exists(fallback_alaska_path):
-                shapefile_path = fallback_alaska_path
-            else:
-                try:
-                    from data_processing import SHAPEFILE_PATH
-                except ImportError:
-                    from backend.data_processing import SHAPEFILE_PATH
-                shapefile_path = SHAPEFILE_PATH
-        shp = gpd.read_file(shapefile_path)
-        shp["geometry"] = shp.geometry.boundary
-    else:
-        shp = gpd.read_file(outline_path)
-    
-    # Ensure GEOID column exists
-    if "GEOID" not in shp.columns:
-        shp["GEOID"] = shp.index.astype(str)
-    shp["GEOID"] = shp["GEOID"].astype(str).str.zfill(5)
-    
-    # Set CRS if missing
-    if shp.crs is None:
-        if projection == "4326":
-            shp = shp.set_crs(4326, allow_override=True)
-        elif projection == "5070":
-            shp = shp.set_crs(5070, allow_override=True)
-        else:
-            shp = shp.set_crs(4269, allow_override=True)
-    
-    # Reproject to EPSG:5070 for consistent transformation
-    target_crs = 5070
-    if shp.crs.to_epsg() != target_crs:
-        shp = shp.to_crs(target_crs)
+    # Load image at natural size - decoded BGR pixels cached per (path, mtime)
+    overlay = _load_image_bgr(image_path)
+    img_height, W = overlay.shape[:2]  # img_height avoids conflict with homography H
     
+    # Load Alaska outline shapefile - cached and already reprojected to 5070
+    shp = _load_region_outline("alaska", projection)
+
     # Get shapefile bounds (source corners in geographic/projected coordinates)
-    xmin, ymin, xmax, ymax = shp.total_bounds
+    xmin, ymin, xmax, ymax = shp.attrs["total_bounds_5070"]
     src_bounds = (xmin, ymin, xmax, ymax)
     
     # Use TPS if provided, otherwise use homography
-    try:
-        from utils.homography import homography_from_4pts, apply_homography_to_geometry, rect_bounds_to_corners
-        from utils.tps import apply_tps_to_geometry
-    except ImportError:
-        from backend.utils.homography import homography_from_4pts, apply_homography_to_geometry, rect_bounds_to_corners
-        from backend.utils.tps import apply_tps_to_geometry
-    
     if tps_func is not None:
         # Use TPS transformation
-        print(f"\n🔧 ALASKA INTERACTIVE OVERLAY TRANSFORMATION (using TPS):")
-        print(f"  Using pre-computed TPS function from county alignment")
-        gdf_px = shp.copy()
-        gdf_px["geometry"] = gdf_px.geometry.apply(
-            lambda geom: apply_tps_to_geometry(geom, tps_func)
-        )
-        gdf_px.crs = None
+        logger.debug("🔧 ALASKA INTERACTIVE OVERLAY TRANSFORMATION (using TPS):")
+        logger.debug("  Using pre-computed TPS function from county alignment")
+        gdf_px = apply_tps_to_gdf(shp, tps_func)
     elif homography_matrix is not None:
         # Check if it's actually a numpy array (homography) or a callable (TPS function mistakenly passed)
         if isinstance(homography_matrix, np.ndarray):
             # Use the homography computed from county points (more accurate)
             H = homography_matrix
-            print(f"\n🔧 ALASKA INTERACTIVE OVERLAY TRANSFORMATION:")
-            print(f"  Using provided homography matrix (from county point alignment)")
-            gdf_px = shp.copy()
-            gdf_px["geometry"] = gdf_px.geometry.apply(
-                lambda geom: apply_homography_to_geometry(geom, H)
-            )
-            gdf_px.crs = None
+            logger.debug("🔧 ALASKA INTERACTIVE OVERLAY TRANSFORMATION:")
+            logger.debug("  Using provided homography matrix (from county point alignment)")
+            gdf_px = transform_gdf_with_matrix(shp, H)
         else:
             # It's a callable (TPS function), use it
-            print(f"\n🔧 ALASKA INTERACTIVE OVERLAY TRANSFORMATION (using TPS from homography_matrix param):")
-            print(f"  Using TPS function (passed as homography_matrix)")
-            gdf_px = shp.copy()
-            gdf_px["geometry"] = gdf_px.geometry.apply(
-                lambda geom: apply_tps_to_geometry(geom, homography_matrix)
-            )
-            gdf_px.crs = None
+            logger.debug("🔧 ALASKA INTERACTIVE OVERLAY TRANSFORMATION (using TPS from homography_matrix param):")
+            logger.debug("  Using TPS function (passed as homography_matrix)")
+            gdf_px = apply_tps_to_gdf(shp, homography_matrix)
     else:
         # Fallback: compute from bounds (less accurate)
         src4 = rect_bounds_to_corners(src_bounds, is_geographic=True)
         dst4 = np.array(alaska_rect4, dtype=float)
         H = homography_from_4pts(src4, dst4)
-        print(f"\n🔧 ALASKA INTERACTIVE OVERLAY TRANSFORMATION:")
-        print(f"  Source corners (shapefile bounds): {src4}")
-        print(f"  Destination corners (user-dragged rect4): {dst4}")
-        print(f"  Computed homography from bounds (fallback)")
-        gdf_px = shp.copy()
-        gdf_px["geometry"] = gdf_px.geometry.apply(
-            lambda geom: apply_homography_to_geometry(geom, H)
-        )
-        gdf_px.crs = None
-    
-    # Rasterize
-    geometries_for_raster = []
-    for geom in gdf_px.geometry:
-        if geom is None or geom.is_empty:
-            continue
-        if geom.geom_type in ("LineString", "MultiLineString"):
-            geom_buffered = geom.buffer(1.0)
-            if not geom_buffered.is_empty:
-                geometries_for_raster.append(geom_buffered)
-        else:
-            geometries_for_raster.append(geom)
-    
-    if geometries_for_raster:
-        mask = rasterize(
-            [(geom, 1) for geom in geometries_for_raster],
-            out_shape=(img_height, W),  # Use img_height instead of H
-            transform=Affine.identity(),
-            fill=0,
-            dtype="uint8"
-        )
-        overlay[mask > 0] = [255, 0, 0]  # Red border
-    
-    # Save overlay
-    result_img = Image.fromarray(overlay)
-    result_img.save(output_path)
+        logger.debug("🔧 ALASKA INTERACTIVE OVERLAY TRANSFORMATION:")
+        logger.debug("  Source corners (shapefile bounds): %s", src4)
+        logger.debug("  Destination corners (user-dragged rect4): %s", dst4)
+        logger.debug("  Computed homography from bounds (fallback)")
+        gdf_px = transform_gdf_with_matrix(shp, H)
+    
+    # Burn the linework with one batched cv2.polylines call - a GDAL-free
+    # C rasterizer with no per-call mask allocation, matching the region
+    # preview's draw path
+    polylines = _boundary_polylines(gdf_px.geometry.values)
+    if polylines:
+        cv2.polylines(overlay, polylines, isClosed=False,
+                      color=(0, 0, 255), thickness=2)  # Red border (BGR)
+    
+    # Save overlay (fast PNG encode - previews are throwaway artifacts)
+    cv2.imwrite(output_path, overlay, [cv2.IMWRITE_PNG_COMPRESSION, 1])
     return output_path
 
@@ -4,15 +4,36 @@ TPS handles nonlinear stretching, curved boundaries, mapmaker distortions,
 non-uniform scaling, and slight perspective skew better than homography.
 """
 
+import logging
+
 import numpy as np
 from typing import Tuple, List
-from shapely.geometry import Point, LineString, Polygon, MultiPoint, MultiLineString, MultiPolygon
+import shapely
 from scipy.interpolate import RBFInterpolator
+from scipy.linalg import lu_factor, lu_solve
+from scipy.spatial.distance import cdist
 import warnings
 
 # Suppress warnings from scipy
 warnings.filterwarnings('ignore', category=RuntimeWarning)
 
+# Debug-level by default: enable with logging.basicConfig(level=logging.DEBUG);
+# %-style args keep disabled records free
+logger = logging.getLogger(__name__)
+
+
+def _tps_kernel(r2: np.ndarray) -> np.ndarray:
+    """
+    Evaluate the TPS radial basis r^2 log(r^2) in place on a squared-distance
+    array. The masked log and in-place multiply avoid the select temporary a
+    np.where formulation would allocate, so the array only crosses memory
+    twice; r2 == 0 entries stay exactly 0 (the kernel's limit value).
+    """
+    phi = np.zeros_like(r2)
+    np.log(r2, out=phi, where=r2 > 0)
+    phi *= r2
+    return phi
+
 
 def tps_transform_from_points(src_points: np.ndarray, dst_points: np.ndarray) -> callable:
     """
@@ -24,6 +45,10 @@ def tps_transform_from_points(src_points: np.ndarray, dst_points: np.ndarray) ->
     
     Returns:
         A function f(x, y) -> (x', y') that transforms any point
+
+    The system is solved in double precision on a normalized source domain;
+    per-vertex evaluation runs in float32, which is ample for pixel-space
+    targets (verify_tps_accuracy reports the residual error).
     """
     # Ensure inputs are numpy arrays with correct shape
     src_points = np.asarray(src_points, dtype=float)
@@ -45,49 +70,78 @@ def tps_transform_from_points(src_points: np.ndarray, dst_points: np.ndarray) ->
     if np.any(np.isnan(dst_points)) or np.any(np.isinf(dst_points)):
         raise ValueError("dst_points contains NaN or Inf values")
     
-    # Use RBFInterpolator with thin-plate spline kernel
-    # The 'thin_plate_spline' kernel is the TPS radial basis function
+    # Solve the classic TPS system directly: [[K, P], [P.T, 0]] with
+    # K_ij = r^2 log(r^2) and P = [1, x, y]. The system matrix is shared by
+    # the X and Y targets, so one LU factorization serves both (RBFInterpolator
+    # would build and factor it twice), and batch evaluation reduces to a
+    # kernel build plus one matrix product
     try:
-        # Extract X and Y coordinates from dst_points
-        dst_x = dst_points[:, 0].flatten()
-        dst_y = dst_points[:, 1].flatten()
-        
-        # Debug: Print shapes for troubleshooting
-        print(f"  TPS Debug: src_points shape: {src_points.shape}, dst_points shape: {dst_points.shape}")
-        print(f"  TPS Debug: dst_x shape: {dst_x.shape}, dst_y shape: {dst_y.shape}")
-        
-        # Validate extracted coordinates
-        if len(dst_x) != len(src_points) or len(dst_y) != len(src_points):
-            raise ValueError(f"Coordinate extraction failed: dst_x length {len(dst_x)}, dst_y length {len(dst_y)}, src_points length {len(src_points)}")
-        
-        # Interpolate X coordinates
-        interp_x = RBFInterpolator(
-            src_points,
-            dst_x,
-            kernel='thin_plate_spline',
-            smoothing=0.0  # Exact interpolation at control points
-        )
-        
-        # Interpolate Y coordinates
-        interp_y = RBFInterpolator(
-            src_points,
-            dst_y,
-            kernel='thin_plate_spline',
-            smoothing=0.0  # Exact interpolation at control points
-        )
-        
+        n = len(src_points)
+
+        logger.debug("  TPS Debug: src_points shape: %s, dst_points shape: %s",
+                     src_points.shape, dst_points.shape)
+
+        # Normalize the source domain to unit scale. The TPS interpolant is
+        # invariant under a similarity transform of the sources (the extra
+        # kernel term folds into the affine part via the side conditions), and
+        # working near unit magnitude is what makes FP32 evaluation safe:
+        # projected-metre coordinates (~1e6) would lose the small r^2 values
+        # to cancellation in single precision.
+        center = src_points.mean(axis=0)
+        scale = max(float(np.abs(src_points - center).max()), 1.0)
+        src_n = (src_points - center) / scale
+
+        K = _tps_kernel(cdist(src_n, src_n) ** 2)
+        P = np.hstack([np.ones((n, 1)), src_n])
+        A = np.zeros((n + 3, n + 3))
+        A[:n, :n] = K
+        A[:n, n:] = P
+        A[n:, :n] = P.T
+
+        # Stacked RHS: exact interpolation at the control points for X and Y
+        rhs = np.zeros((n + 3, 2))
+        rhs[:n] = dst_points
+        W = lu_solve(lu_factor(A), rhs)  # (n+3, 2) weights
+
+        # FP32 for the per-vertex evaluation: pixel outputs need far less
+        # than single precision's ~1e-7 relative accuracy, and halving the
+        # bytes halves both the GEMM time and the kernel-block bandwidth
+        src32 = np.ascontiguousarray(src_n, dtype=np.float32)
+        src_sq = np.einsum("ij,ij->i", src32, src32)
+        W32 = W.astype(np.float32)
+        center32 = center.astype(np.float32)
+        inv_scale = np.float32(1.0 / scale)
+
+        def transform_batch(coords: np.ndarray) -> np.ndarray:
+            """Transform an (M, 2) coordinate array in one kernel eval + GEMM."""
+            coords = (np.asarray(coords, dtype=np.float32) - center32) * inv_scale
+            # |q - s|^2 = |q|^2 + |s|^2 - 2 q.s: the cross term is one GEMM
+            # and no (M, N, 2) difference tensor ever materializes
+            q_sq = np.einsum("ij,ij->i", coords, coords)
+            r2 = q_sq[:, None] + src_sq[None, :]
+            r2 -= np.float32(2.0) * (coords @ src32.T)
+            np.maximum(r2, 0.0, out=r2)  # cancellation can leave tiny negatives
+            phi = _tps_kernel(r2)
+            return np.hstack([phi, np.ones((len(coords), 1), np.float32), coords]) @ W32
+
         def transform_func(x, y):
             """Transform a single point (x, y) -> (x', y')"""
-            point = np.array([[x, y]])
-            x_new = interp_x(point)[0]
-            y_new = interp_y(point)[0]
-            return (float(x_new), float(y_new))
-        
+            out = transform_batch(np.array([[x, y]]))
+            return (float(out[0, 0]), float(out[0, 1]))
+
+        # Expose the batch evaluator so geometry-level callers can transform
+        # all vertices in one call instead of one kernel eval per point
+        transform_func.batch = transform_batch
+
+        # Guard against a singular system (e.g. collinear control points)
+        if not np.all(np.isfinite(W)):
+            raise np.linalg.LinAlgError("TPS system is singular")
+
         return transform_func
     except Exception as e:
-        # Fallback to simpler interpolation if scipy version doesn't support thin_plate_spline
-        print(f"  ⚠️  TPS using thin_plate_spline kernel failed: {e}")
-        print(f"  Falling back to cubic interpolation")
+        # Fallback for degenerate control-point configurations
+        logger.debug("  ⚠️  TPS closed-form solver failed: %s", e)
+        logger.debug("  Falling back to cubic interpolation")
         
         # Fallback: use cubic RBF
         dst_x = dst_points[:, 0].flatten()
@@ -106,12 +160,16 @@ def tps_transform_from_points(src_points: np.ndarray, dst_points: np.ndarray) ->
             smoothing=0.0
         )
         
+        def transform_batch(coords: np.ndarray) -> np.ndarray:
+            coords = np.asarray(coords, dtype=float)
+            return np.column_stack([interp_x(coords), interp_y(coords)])
+
         def transform_func(x, y):
-            point = np.array([[x, y]])
-            x_new = interp_x(point)[0]
-            y_new = interp_y(point)[0]
-            return (float(x_new), float(y_new))
-        
+            out = transform_batch(np.array([[x, y]]))
+            return (float(out[0, 0]), float(out[0, 1]))
+
+        transform_func.batch = transform_batch
+
         return transform_func
 
 
@@ -120,57 +178,62 @@ def apply_tps_to_xy(x: float, y: float, tps_func: callable) -> Tuple[float, floa
     return tps_func(x, y)
 
 
+def _batch_eval(tps_func: callable, coords: np.ndarray) -> np.ndarray:
+    """Evaluate a TPS function on an (N, 2) array, preferring its batch path."""
+    batch = getattr(tps_func, "batch", None)
+    if batch is not None:
+        # Deduplicate vertices before evaluating: shared county borders (and
+        # ring closures) repeat coordinates, and mapping duplicates through
+        # one evaluation also guarantees bit-identical outputs for identical
+        # inputs - BLAS tiling does not, which would break ring closure
+        uniq, inverse = np.unique(coords, axis=0, return_inverse=True)
+        return np.asarray(batch(uniq), dtype=float)[inverse]
+    # Foreign callables without a batch evaluator: fall back to per-point calls
+    return np.array([tps_func(x, y) for x, y in coords], dtype=float)
+
+
 def apply_tps_to_geometry(geom, tps_func: callable):
     """
     Apply TPS transformation to a Shapely geometry.
-    
+
+    Every vertex of the geometry (all rings and parts) is gathered into one
+    (N, 2) array and transformed in a single batch evaluation, then written
+    back with the ring/part structure preserved - no per-point Python calls.
+
     Args:
         geom: Shapely geometry (Point, LineString, Polygon, etc.)
         tps_func: TPS transformation function from tps_transform_from_points
-    
+
     Returns:
         Transformed geometry
     """
     if geom is None or geom.is_empty:
         return geom
-    
-    def transform_point(pt):
-        x, y = pt.coords[0]
-        x_new, y_new = apply_tps_to_xy(x, y, tps_func)
-        return Point(x_new, y_new)
-    
-    def transform_linestring(ls):
-        coords = [apply_tps_to_xy(x, y, tps_func) for x, y in ls.coords]
-        return LineString(coords)
-    
-    def transform_polygon(poly):
-        exterior = transform_linestring(poly.exterior)
-        interiors = [transform_linestring(interior) for interior in poly.interiors]
-        return Polygon(exterior, interiors)
-    
-    geom_type = geom.geom_type
-    
-    if geom_type == "Point":
-        return transform_point(geom)
-    elif geom_type == "LineString":
-        return transform_linestring(geom)
-    elif geom_type == "Polygon":
-        return transform_polygon(geom)
-    elif geom_type == "MultiPoint":
-        return MultiPoint([transform_point(pt) for pt in geom.geoms])
-    elif geom_type == "MultiLineString":
-        return MultiLineString([transform_linestring(ls) for ls in geom.geoms])
-    elif geom_type == "MultiPolygon":
-        return MultiPolygon([transform_polygon(poly) for poly in geom.geoms])
-    else:
-        # Fallback: try to transform coordinates directly
-        coords = [apply_tps_to_xy(x, y, tps_func) for x, y in geom.coords]
-        if len(coords) == 1:
-            return Point(coords[0])
-        elif len(coords) == 2:
-            return LineString(coords)
-        else:
-            return Polygon(coords)
+
+    # shapely.transform handles the coordinate round trip in C for any
+    # geometry type; the callback sees one (N, 2) array of all vertices
+    return shapely.transform(geom, lambda coords: _batch_eval(tps_func, coords))
+
+
+def apply_tps_to_gdf(gdf, tps_func: callable):
+    """
+    Apply a TPS transformation to every geometry of a GeoDataFrame.
+
+    All vertices across the whole frame are concatenated into one (N, 2)
+    array and pushed through a single batch evaluation, so the kernel build
+    is amortized over every county instead of paid per geometry
+    (one get_coordinates/set_coordinates round trip, no per-row apply).
+
+    Returns a new GeoDataFrame with attributes shared and a fresh geometry
+    column; crs is cleared since the output is in pixel space.
+    """
+    geoms = gdf.geometry.values
+    coords = shapely.get_coordinates(geoms)
+    new_coords = _batch_eval(tps_func, coords)
+    out = gdf.copy(deep=False)
+    out["geometry"] = shapely.set_coordinates(geoms.copy(), new_coords)
+    out.crs = None
+    return out
 
 
 def verify_tps_accuracy(tps_func: callable, src_points: np.ndarray, dst_points: np.ndarray) -> float:
@@ -180,11 +243,11 @@ def verify_tps_accuracy(tps_func: callable, src_points: np.ndarray, dst_points:
     Returns:
         Maximum error in pixels
     """
-    max_error = 0.0
-    for src, dst in zip(src_points, dst_points):
-        x, y = src
-        x_transformed, y_transformed = tps_func(x, y)
-        error = np.sqrt((x_transformed - dst[0])**2 + (y_transformed - dst[1])**2)
-        max_error = max(max_error, error)
-    return max_error
+    src_points = np.asarray(src_points, dtype=float)
+    dst_points = np.asarray(dst_points, dtype=float)
+    if len(src_points) == 0:
+        return 0.0
+    transformed = _batch_eval(tps_func, src_points)
+    errors = np.linalg.norm(transformed - dst_points, axis=1)
+    return float(errors.max())
 
@@ -52,6 +52,13 @@ def create_conus_shapefile():
     # Save the CONUS-only shapefile
     print(f"\nSaving CONUS shapefile to {OUTPUT_SHAPEFILE}...")
     gdf_conus.to_file(OUTPUT_SHAPEFILE)
+
+    # Also write a FlatGeobuf sidecar: single file, spatially indexed, and
+    # much faster for the backend to load than the dBase-era shapefile
+    # (readers pick it up automatically when it sits next to the .shp)
+    fgb_path = OUTPUT_SHAPEFILE.with_suffix(".fgb")
+    print(f"Saving FlatGeobuf sidecar to {fgb_path}...")
+    gdf_conus.to_file(fgb_path)
     
     print(f"✓ CONUS shapefile created successfully!")
     print(f"  Location: {OUTPUT_SHAPEFILE}")
@@ -4,86 +4,88 @@ Script to create shapefiles in different projections (EPSG:4326 and EPSG:5070).
 Creates both CONUS-only versions in each projection.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
 import geopandas as gpd
+import numpy as np
 from pathlib import Path
 
+from regions import (
+    FULL_SHAPEFILE,
+    TERRITORY_FIPS,
+    fast_to_crs,
+    load_us_counties,
+    slim_columns,
+    state_fips,
+    write_with_sidecar,
+)
+
 BASE_DIR = Path(__file__).parent
 CONUS_SHAPEFILE = BASE_DIR / "cb_2024_us_county_500k_conus" / "cb_2024_us_county_500k_conus.shp"
-FULL_SHAPEFILE = BASE_DIR / "cb_2024_us_county_500k" / "cb_2024_us_county_500k.shp"
+
+
+def _read_counties(shp_path):
+    """Read a county layer once, preferring the FlatGeobuf sidecar when present."""
+    fgb_path = shp_path.with_suffix(".fgb")
+    gdf = gpd.read_file(fgb_path if fgb_path.exists() else shp_path)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(4269, allow_override=True)
+    return gdf
+
+
+def _export_projections(gdf, stem, label):
+    """Project one already-loaded frame to each target CRS and write it out."""
+
+    def _one(epsg):
+        output_dir = BASE_DIR / f"{stem}_epsg{epsg}"
+        output_dir.mkdir(exist_ok=True)
+        output_file = output_dir / f"{stem}_epsg{epsg}.shp"
+
+        gdf_projected = fast_to_crs(gdf, epsg)
+        write_with_sidecar(gdf_projected, output_file)
+
+        return (f"✓ Saved {label}: {output_file}\n"
+                f"  CRS: {gdf_projected.crs}\n"
+                f"  Bounds: {gdf_projected.total_bounds}")
+
+    # The two targets are independent; PROJ transforms and GDAL writes both
+    # release the GIL, so running them on two threads overlaps CPU with I/O
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for lines in pool.map(_one, (4326, 5070)):
+            print(lines)
+
 
 def create_projected_shapefiles():
     """Create shapefiles in EPSG:4326 and EPSG:5070 projections."""
-    
-    # Load CONUS shapefile (currently in EPSG:4269)
+
+    # Load CONUS shapefile (currently in EPSG:4269). This is the clipped
+    # CONUS dataset, so it cannot be derived by subsetting the full file -
+    # it gets its own read, shared by both projection outputs below.
     if not CONUS_SHAPEFILE.exists():
         raise FileNotFoundError(f"CONUS shapefile not found at {CONUS_SHAPEFILE}")
-    
+
     print(f"Loading CONUS shapefile from {CONUS_SHAPEFILE}...")
-    gdf_conus = gpd.read_file(CONUS_SHAPEFILE)
-    
+    gdf_conus = slim_columns(_read_counties(CONUS_SHAPEFILE))
+
     print(f"Original CRS: {gdf_conus.crs}")
     print(f"Counties: {len(gdf_conus)}")
-    
-    # Ensure we have a CRS
-    if gdf_conus.crs is None:
-        gdf_conus = gdf_conus.set_crs(4269, allow_override=True)
-    
-    # Create EPSG:4326 version
-    print("\nCreating EPSG:4326 (WGS84) version...")
-    gdf_4326 = gdf_conus.to_crs(4326)
-    
-    output_dir_4326 = BASE_DIR / "cb_2024_us_county_500k_conus_epsg4326"
-    output_dir_4326.mkdir(exist_ok=True)
-    output_file_4326 = output_dir_4326 / "cb_2024_us_county_500k_conus_epsg4326.shp"
-    
-    gdf_4326.to_file(output_file_4326)
-    print(f"✓ Saved: {output_file_4326}")
-    print(f"  CRS: {gdf_4326.crs}")
-    print(f"  Bounds: {gdf_4326.total_bounds}")
-    
-    # Create EPSG:5070 version
-    print("\nCreating EPSG:5070 (CONUS Albers) version...")
-    gdf_5070 = gdf_conus.to_crs(5070)
-    
-    output_dir_5070 = BASE_DIR / "cb_2024_us_county_500k_conus_epsg5070"
-    output_dir_5070.mkdir(exist_ok=True)
-    output_file_5070 = output_dir_5070 / "cb_2024_us_county_500k_conus_epsg5070.shp"
-    
-    gdf_5070.to_file(output_file_5070)
-    print(f"✓ Saved: {output_file_5070}")
-    print(f"  CRS: {gdf_5070.crs}")
-    print(f"  Bounds: {gdf_5070.total_bounds}")
-    
-    # Also create full versions if full shapefile exists
+
+    print("\nCreating EPSG:4326 and EPSG:5070 versions...")
+    _export_projections(gdf_conus, "cb_2024_us_county_500k_conus", "CONUS")
+
+    # Also create full versions if full shapefile exists: one read of the
+    # full file feeds the territory filter and both projection outputs
     if FULL_SHAPEFILE.exists():
         print(f"\nCreating full shapefile versions (including Alaska/Hawaii)...")
-        gdf_full = gpd.read_file(FULL_SHAPEFILE)
-        
-        if gdf_full.crs is None:
-            gdf_full = gdf_full.set_crs(4269, allow_override=True)
-        
-        # Filter to CONUS + Alaska + Hawaii (exclude territories)
-        if "GEOID" not in gdf_full.columns:
-            gdf_full["GEOID"] = gdf_full.index.astype(str)
-        gdf_full["GEOID"] = gdf_full["GEOID"].astype(str).str.zfill(5)
-        gdf_full_us = gdf_full[~gdf_full["GEOID"].str.startswith(("60", "66", "69", "72", "78"))].copy()
-        
-        # EPSG:4326 full version (CONUS + Alaska + Hawaii)
-        gdf_full_4326 = gdf_full_us.to_crs(4326)
-        output_dir_full_4326 = BASE_DIR / "cb_2024_us_county_500k_full_epsg4326"
-        output_dir_full_4326.mkdir(exist_ok=True)
-        output_file_full_4326 = output_dir_full_4326 / "cb_2024_us_county_500k_full_epsg4326.shp"
-        gdf_full_4326.to_file(output_file_full_4326)
-        print(f"✓ Saved full (US): {output_file_full_4326}")
-        
-        # EPSG:5070 full version (CONUS + Alaska + Hawaii)
-        gdf_full_5070 = gdf_full_us.to_crs(5070)
-        output_dir_full_5070 = BASE_DIR / "cb_2024_us_county_500k_full_epsg5070"
-        output_dir_full_5070.mkdir(exist_ok=True)
-        output_file_full_5070 = output_dir_full_5070 / "cb_2024_us_county_500k_full_epsg5070.shp"
-        gdf_full_5070.to_file(output_file_full_5070)
-        print(f"✓ Saved full (US): {output_file_full_5070}")
-    
+        # Shared cached read: GEOID already normalized, CRS guaranteed
+        gdf_full = load_us_counties()
+
+        # Filter to CONUS + Alaska + Hawaii (exclude territories), keeping
+        # only the attribute columns the backend reads
+        gdf_full_us = slim_columns(gdf_full[~np.isin(state_fips(gdf_full), TERRITORY_FIPS)])
+
+        _export_projections(gdf_full_us, "cb_2024_us_county_500k_full", "full (US)")
+
     print("\n✓ All projected shapefiles created successfully!")
     return True
 
@@ -94,4 +96,3 @@ if __name__ == "__main__":
         print(f"✗ Error: {e}")
         import traceback
         traceback.print_exc()
-
@@ -4,11 +4,42 @@ Script to create separate shapefiles for CONUS, Alaska, and Hawaii.
 Creates shapefiles in both EPSG:4326 and EPSG:5070 projections.
 """
 
-import geopandas as gpd
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 from pathlib import Path
 
+from regions import (
+    FULL_SHAPEFILE,
+    fast_to_crs,
+    load_us_counties,
+    slim_columns,
+    split_regions,
+    write_with_sidecar,
+)
+
 BASE_DIR = Path(__file__).parent
-FULL_SHAPEFILE = BASE_DIR / "cb_2024_us_county_500k" / "cb_2024_us_county_500k.shp"
+
+
+def _project_and_write(task):
+    """Project one region to one CRS and write it; returns the log lines."""
+    region_name, gdf_region, proj_name, epsg_code = task
+
+    output_dir = BASE_DIR / f"cb_2024_us_county_500k_{region_name}_epsg{proj_name}"
+    output_dir.mkdir(exist_ok=True)
+
+    gdf_projected = fast_to_crs(gdf_region, epsg_code)
+
+    output_file = output_dir / f"cb_2024_us_county_500k_{region_name}_epsg{proj_name}.shp"
+    write_with_sidecar(gdf_projected, output_file)
+
+    lines = (f"  ✓ {region_name.upper()} EPSG:{epsg_code} → {output_file}\n"
+             f"    Bounds: {gdf_projected.total_bounds}")
+    # Drop the projected copy as soon as it is on disk: together with the
+    # worker cap below, at most a few projected frames are resident at once
+    del gdf_projected
+    return lines
+
 
 def create_separate_region_shapefiles():
     """Create separate CONUS, Alaska, and Hawaii shapefiles in both projections."""
@@ -17,38 +48,23 @@ def create_separate_region_shapefiles():
         raise FileNotFoundError(f"Full shapefile not found at {FULL_SHAPEFILE}")
     
     print(f"Loading full shapefile from {FULL_SHAPEFILE}...")
-    gdf = gpd.read_file(FULL_SHAPEFILE)
-    
-    # Ensure GEOID column exists
-    if "GEOID" not in gdf.columns:
-        gdf["GEOID"] = gdf.index.astype(str)
-    gdf["GEOID"] = gdf["GEOID"].astype(str).str.zfill(5)
-    
+    # Shared cached read: GEOID is normalized and a CRS guaranteed, and any
+    # other prep script in the same process reuses the decoded frame
+    gdf = load_us_counties()
+
     print(f"Total counties: {len(gdf)}")
     print(f"Original CRS: {gdf.crs}")
-    
-    # Separate regions
-    gdf_conus = gdf[~gdf["GEOID"].str.startswith(("02", "15", "60", "66", "69", "72", "78"))].copy()
-    gdf_alaska = gdf[gdf["GEOID"].str.startswith("02")].copy()
-    gdf_hawaii = gdf[gdf["GEOID"].str.startswith("15")].copy()
-    
+
+    # Separate regions: one vectorized scan of the state FIPS prefixes
+    # serves all three masks. Unused attribute columns are dropped first so
+    # the reprojected copies and the DBF outputs stay slim.
+    regions = split_regions(slim_columns(gdf))
+
     print(f"\nSeparated regions:")
-    print(f"  CONUS: {len(gdf_conus)} counties")
-    print(f"  Alaska: {len(gdf_alaska)} counties")
-    print(f"  Hawaii: {len(gdf_hawaii)} counties")
-    
-    # Ensure CRS is set
-    if gdf.crs is None:
-        gdf_conus = gdf_conus.set_crs(4269, allow_override=True)
-        gdf_alaska = gdf_alaska.set_crs(4269, allow_override=True)
-        gdf_hawaii = gdf_hawaii.set_crs(4269, allow_override=True)
-    
-    regions = {
-        "conus": gdf_conus,
-        "alaska": gdf_alaska,
-        "hawaii": gdf_hawaii
-    }
-    
+    print(f"  CONUS: {len(regions['conus'])} counties")
+    print(f"  Alaska: {len(regions['alaska'])} counties")
+    print(f"  Hawaii: {len(regions['hawaii'])} counties")
+
     projections = {
         "4326": 4326,
         "5070": 5070
@@ -58,29 +74,29 @@ def create_separate_region_shapefiles():
     print("CREATING SEPARATE REGION SHAPEFILES")
     print("=" * 70)
     
+    # Build the region × projection task list, then run the six independent
+    # project-and-write jobs on a thread pool: the PROJ transform and the
+    # GDAL write both release the GIL, so CPU and I/O overlap across tasks
+    tasks = []
     for region_name, gdf_region in regions.items():
         if len(gdf_region) == 0:
             print(f"\n⚠️  Skipping {region_name.upper()} (no counties)")
             continue
-            
+
         print(f"\n📂 Processing {region_name.upper()}:")
         print(f"  Counties: {len(gdf_region)}")
         print(f"  Bounds: {gdf_region.total_bounds}")
-        
+
         for proj_name, epsg_code in projections.items():
-            # Create directory
-            output_dir = BASE_DIR / f"cb_2024_us_county_500k_{region_name}_epsg{proj_name}"
-            output_dir.mkdir(exist_ok=True)
-            
-            # Project to target CRS
-            gdf_projected = gdf_region.to_crs(epsg_code)
-            
-            # Save shapefile
-            output_file = output_dir / f"cb_2024_us_county_500k_{region_name}_epsg{proj_name}.shp"
-            gdf_projected.to_file(output_file)
-            
-            print(f"  ✓ EPSG:{epsg_code} → {output_file}")
-            print(f"    Bounds: {gdf_projected.total_bounds}")
+            tasks.append((region_name, gdf_region, proj_name, epsg_code))
+
+    print()
+    # Worker cap doubles as the memory ceiling: each in-flight job owns one
+    # projected copy of its region, so peak usage is the three source frames
+    # plus at most max_workers projected frames
+    with ThreadPoolExecutor(max_workers=min(len(tasks) or 1, os.cpu_count() or 1, 4)) as pool:
+        for lines in pool.map(_project_and_write, tasks):
+            print(lines)
     
     print("\n" + "=" * 70)
     print("✅ All separate region shapefiles created successfully!")
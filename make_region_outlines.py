@@ -5,8 +5,11 @@ Creates 6 outline datasets: conus/alaska/hawaii × epsg4326/epsg5070
 """
 
 import geopandas as gpd
+import shapely
 from pathlib import Path
 
+from regions import write_with_sidecar
+
 REGIONS = [
     ("conus", "cb_2024_us_county_500k_conus"),
     ("alaska", "cb_2024_us_county_500k_alaska"),
@@ -20,18 +23,28 @@ root = Path(__file__).resolve().parent  # project root
 
 def outline_from_folder(folder: Path) -> gpd.GeoDataFrame:
     """
-    Load county polygons and extract boundaries (linework) for ALL counties.
-    This preserves all internal county boundaries, not just the outer perimeter.
+    Load county polygons and produce the region's complete linework as a
+    single merged feature. ALL internal county boundaries are preserved,
+    not just the outer perimeter.
     """
-    gdf = gpd.read_file(folder)  # polygons (counties)
-    
+    # Only geometry matters for linework; columns=[] lets pyogrio skip
+    # decoding every attribute field
+    gdf = gpd.read_file(folder, columns=[])  # polygons (counties)
+
     # Extract boundary from EACH county polygon (preserves all internal boundaries)
-    # This gives us all county boundaries: both outer edges and shared edges between counties
-    gdf["geometry"] = gdf.geometry.boundary  # Convert each polygon to its boundary LineString
-    
-    # The result is a GeoDataFrame with LineString geometries for each county boundary
-    # When rendered, these will show all county lines within the region
-    return gdf
+    # shapely.boundary runs over the whole GeometryArray in one C loop instead of
+    # dispatching per geometry through the Series accessor
+    boundaries = shapely.boundary(gdf.geometry.values)
+
+    # Adjacent counties share edges, so per-county boundaries carry every
+    # interior line twice. unary_union dissolves the duplicates (the lines
+    # still render identically) and line_merge stitches touching segments
+    # into maximal LineStrings - roughly half the vertices on disk and in
+    # every downstream load
+    merged = shapely.line_merge(shapely.unary_union(boundaries))
+
+    # One MultiLineString feature holding the region's full county linework
+    return gpd.GeoDataFrame(geometry=[merged], crs=gdf.crs)
 
 
 def main():
@@ -52,7 +65,7 @@ def main():
             output_shp = out / f"{rname}_outline.shp"
             # Handle CRS issues - try to save with CRS, fallback to no CRS if needed
             try:
-                gdf_line.to_file(output_shp)
+                write_with_sidecar(gdf_line, output_shp)
             except Exception as e:
                 # If CRS causes issues, try saving without CRS (shapefile will still have projection info)
                 print(f"    ⚠️  CRS error, trying without explicit CRS: {e}")
@@ -68,7 +81,7 @@ def main():
             
             print(f"  ✓ Wrote {output_shp}")
             print(f"    CRS: {gdf_line.crs}")
-            print(f"    Counties: {len(gdf_line)}")
+            print(f"    Features: {len(gdf_line)}")
             print(f"    Geometry type: {gdf_line.geometry.iloc[0].geom_type if len(gdf_line) > 0 else 'N/A'}")
             print()
 
@@ -0,0 +1,155 @@
+"""
+Shared helpers for the county-shapefile preparation scripts
+(create_projected_shapefiles.py, create_separate_region_shapefiles.py,
+visualize_shapefile.py).
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from pyproj import Transformer
+
+BASE_DIR = Path(__file__).parent
+FULL_SHAPEFILE = BASE_DIR / "cb_2024_us_county_500k" / "cb_2024_us_county_500k.shp"
+
+# Below this many vertices the thread fan-out costs more than it saves
+_PARALLEL_MIN_COORDS = 200_000
+
+# State FIPS prefixes: territories (American Samoa, Guam, Northern Mariana
+# Islands, Puerto Rico, US Virgin Islands), plus Alaska/Hawaii for CONUS
+TERRITORY_FIPS = ("60", "66", "69", "72", "78")
+NON_CONUS_FIPS = ("02", "15") + TERRITORY_FIPS
+
+# The only attribute columns the backend reads from these datasets:
+# GEOID for county joins, NAME and STUSPS for display labels
+KEPT_COLUMNS = ["GEOID", "NAME", "STUSPS"]
+
+
+def slim_columns(gdf):
+    """
+    Keep only the attribute columns downstream consumers use, plus
+    geometry. Everything else (STATEFP, NAMELSAD, ALAND, ...) would just
+    be copied through every reprojection and written into every DBF.
+    """
+    keep = [c for c in KEPT_COLUMNS if c in gdf.columns]
+    return gdf[keep + [gdf.geometry.name]]
+
+
+def state_fips(gdf):
+    """
+    Return the two-character state FIPS prefix of every GEOID as a numpy
+    array. One kernel over a fixed-width string buffer (astype("U2")
+    truncates to the first two characters), so region masks become
+    np.isin/== comparisons on this array instead of repeated pandas
+    .str.startswith scans over Python string objects.
+    """
+    return gdf["GEOID"].to_numpy().astype("U5").astype("U2")
+
+
+@lru_cache(maxsize=None)
+def _get_transformer(src_crs, epsg):
+    """
+    Cache Transformer construction per (source CRS, target EPSG) pair.
+    Building a Transformer parses and compiles a PROJ pipeline, which is
+    the expensive part of small reprojections; the handful of CRS pairs
+    these scripts use (4269/4326/5070) get built exactly once per run.
+    """
+    return Transformer.from_crs(src_crs, epsg, always_xy=True)
+
+
+def _transform_coords(transformer, coords):
+    """
+    Run Transformer.transform over an (N, 2) array, splitting large arrays
+    across a thread pool. pyproj releases the GIL during transform and the
+    Transformer is thread-safe (each thread works on its own PROJ context),
+    so the chunks genuinely run in parallel.
+    """
+    n = len(coords)
+    workers = min(os.cpu_count() or 1, 8)
+    if n < _PARALLEL_MIN_COORDS or workers < 2:
+        xs, ys = transformer.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack([xs, ys])
+
+    out = np.empty((n, 2))
+    bounds = np.linspace(0, n, workers + 1, dtype=int)
+
+    def _chunk(i):
+        lo, hi = bounds[i], bounds[i + 1]
+        out[lo:hi, 0], out[lo:hi, 1] = transformer.transform(
+            coords[lo:hi, 0], coords[lo:hi, 1]
+        )
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_chunk, range(workers)))
+    return out
+
+
+@lru_cache(maxsize=1)
+def load_us_counties():
+    """
+    Read the full US county file (preferring the .fgb sidecar when present)
+    with GEOID normalized and a CRS guaranteed. Cached, so a pipeline that
+    runs several prep scripts in one process pays for the decode once.
+    Callers that modify the frame should work on a copy (split_regions
+    already returns copies).
+    """
+    fgb_path = FULL_SHAPEFILE.with_suffix(".fgb")
+    gdf = gpd.read_file(fgb_path if fgb_path.exists() else FULL_SHAPEFILE)
+    if "GEOID" not in gdf.columns:
+        gdf["GEOID"] = gdf.index.astype(str)
+    gdf["GEOID"] = gdf["GEOID"].astype(str).str.zfill(5)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(4269, allow_override=True)
+    return gdf
+
+
+def split_regions(gdf):
+    """
+    Split a county frame into its CONUS / Alaska / Hawaii subsets from a
+    single state-FIPS prefix scan (territories are dropped entirely).
+    """
+    fips = state_fips(gdf)
+    return {
+        "conus": gdf[~np.isin(fips, NON_CONUS_FIPS)].copy(),
+        "alaska": gdf[fips == "02"].copy(),
+        "hawaii": gdf[fips == "15"].copy(),
+    }
+
+
+def write_with_sidecar(gdf, shp_path):
+    """
+    Write a shapefile plus a FlatGeobuf sidecar. The .fgb is a single
+    spatially-indexed file that loads much faster than the multi-file
+    shapefile; readers that know about it (the backend loaders) pick it
+    up automatically when it sits next to the .shp.
+    """
+    gdf.to_file(shp_path)
+    gdf.to_file(shp_path.with_suffix(".fgb"))
+
+
+def fast_to_crs(gdf, epsg):
+    """
+    Reproject a GeoDataFrame with one vectorized pyproj call.
+
+    GeoSeries.to_crs dispatches through GEOS geometry by geometry. Here the
+    whole frame's vertices are flattened into one contiguous array with
+    shapely.get_coordinates, pushed through Transformer.transform in a
+    single C call, and written back with ring/part structure preserved.
+    Same coordinates out, a fraction of the per-geometry overhead.
+    """
+    if gdf.crs is None:
+        raise ValueError("fast_to_crs requires a source CRS on the GeoDataFrame")
+
+    geoms = gdf.geometry.values
+    coords = shapely.get_coordinates(geoms)
+    transformer = _get_transformer(gdf.crs, epsg)
+    new_coords = _transform_coords(transformer, coords)
+
+    out = gdf.copy(deep=False)
+    out["geometry"] = shapely.set_coordinates(geoms.copy(), new_coords)
+    return out.set_crs(epsg, allow_override=True)
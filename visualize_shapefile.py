@@ -5,14 +5,27 @@ Script to visualize the US county shapefile and save it as an image.
 
 import os
 import geopandas as gpd
+import shapely
+import matplotlib
+matplotlib.use("Agg")  # headless raster output; skips GUI backend probing
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PolyCollection
 from pathlib import Path
 
+import numpy as np
+
+from regions import fast_to_crs, state_fips
+
 # Get the shapefile path - try CONUS shapefile first, fallback to full
 BASE_DIR = Path(__file__).parent
 CONUS_SHAPEFILE_PATH = BASE_DIR / "cb_2024_us_county_500k_conus" / "cb_2024_us_county_500k_conus.shp"
 FULL_SHAPEFILE_PATH = BASE_DIR / "cb_2024_us_county_500k" / "cb_2024_us_county_500k.shp"
 
+# Rough CONUS extent in NAD83 degrees. Pushing this into the reader lets
+# GDAL's spatial filter skip Alaska/Hawaii/territory features before their
+# geometries are ever decoded when only the full file is available.
+CONUS_BBOX_4269 = (-125.0, 24.0, -66.0, 50.0)
+
 def visualize_shapefile(output_path="shapefile_visualization.png", use_conus=True):
     """Load and visualize the shapefile, saving it as an image."""
     
@@ -28,8 +41,15 @@ def visualize_shapefile(output_path="shapefile_visualization.png", use_conus=Tru
     
     print(f"Loading shapefile from {SHAPEFILE_PATH}...")
     
-    # Load the shapefile
-    gdf = gpd.read_file(SHAPEFILE_PATH)
+    # Load the shapefile. Only GEOID (for the CONUS filter) and geometry are
+    # used here; columns= lets pyogrio skip decoding the dozen other DBF
+    # attribute fields entirely. The full file additionally gets a bbox
+    # filter so non-CONUS rows are dropped inside the reader (the GEOID
+    # prefix mask below still catches any bbox-grazing stragglers).
+    if SHAPEFILE_PATH == FULL_SHAPEFILE_PATH:
+        gdf = gpd.read_file(SHAPEFILE_PATH, columns=["GEOID"], bbox=CONUS_BBOX_4269)
+    else:
+        gdf = gpd.read_file(SHAPEFILE_PATH, columns=["GEOID"])
     
     print(f"Loaded {len(gdf)} counties")
     print(f"CRS: {gdf.crs}")
@@ -42,7 +62,7 @@ def visualize_shapefile(output_path="shapefile_visualization.png", use_conus=Tru
         gdf["GEOID"] = gdf["GEOID"].astype(str).str.zfill(5)
         
         # Filter out Alaska (02) and Hawaii (15)
-        gdf = gdf[~gdf["GEOID"].str.startswith(("02", "15"))].copy()
+        gdf = gdf[~np.isin(state_fips(gdf), ("02", "15"))].copy()
     
     gdf_conus = gdf.copy()
     
@@ -53,7 +73,16 @@ def visualize_shapefile(output_path="shapefile_visualization.png", use_conus=Tru
         gdf_conus = gdf_conus.set_crs(4269, allow_override=True)  # NAD83
     
     # Use CONUS Albers (EPSG:5070) for better visualization
-    gdf_conus = gdf_conus.to_crs(5070)
+    gdf_conus = fast_to_crs(gdf_conus, 5070)
+
+    # Sub-pixel simplification: the rendered map is ~3600 px across ~4600 km
+    # of CONUS, so one pixel spans over a kilometre and vertices within
+    # 500 m of a chord are invisible. Douglas-Peucker in GEOS cuts the
+    # vertex count the Agg renderer has to tessellate and stroke by
+    # several times with no visible change at this scale.
+    gdf_conus["geometry"] = shapely.simplify(
+        gdf_conus.geometry.values, tolerance=500, preserve_topology=False
+    )
     
     # Get CONUS bounds for cropping - no margin, tight to bounds
     bounds = gdf_conus.total_bounds
@@ -74,14 +103,22 @@ def visualize_shapefile(output_path="shapefile_visualization.png", use_conus=Tru
     # Create the visualization with no margins
     fig, ax = plt.subplots(1, 1, figsize=(fig_width, fig_height))
     
-    # Plot the counties with borders
-    gdf_conus.plot(
-        ax=ax,
-        facecolor='lightblue',
-        edgecolor='navy',
-        linewidth=0.3,
-        alpha=0.7
-    )
+    # Plot the counties with borders. GeoDataFrame.plot builds a matplotlib
+    # patch per polygon; collecting the rings once and handing Agg two bulk
+    # collections (faces + linework) strokes everything in two draw calls.
+    # Interior rings only join the linework: every hole is filled by the
+    # county inside it, so faces from exteriors alone look identical.
+    faces, rings = [], []
+    for geom in gdf_conus.geometry:
+        parts = geom.geoms if geom.geom_type == "MultiPolygon" else (geom,)
+        for poly in parts:
+            exterior = np.asarray(poly.exterior.coords)
+            faces.append(exterior)
+            rings.append(exterior)
+            for interior in poly.interiors:
+                rings.append(np.asarray(interior.coords))
+    ax.add_collection(PolyCollection(faces, facecolors='lightblue', edgecolors='none', alpha=0.7))
+    ax.add_collection(LineCollection(rings, colors='navy', linewidths=0.3, alpha=0.7))
     
     # Crop to CONUS bounds exactly (no margin)
     ax.set_xlim(minx, maxx)
@@ -95,9 +132,12 @@ def visualize_shapefile(output_path="shapefile_visualization.png", use_conus=Tru
     ax.set_aspect('equal')
     ax.margins(0, 0)
     
-    # Save the figure with no padding
+    # Save the figure with no padding. The explicit limits and zero-margin
+    # subplots_adjust above already make the canvas exactly the data bounds,
+    # so bbox_inches='tight' (which renders a second time just to measure
+    # the bounding box) is unnecessary
     output_full_path = BASE_DIR / output_path
-    plt.savefig(output_full_path, dpi=300, bbox_inches='tight', pad_inches=0, facecolor='white')
+    plt.savefig(output_full_path, dpi=300, facecolor='white')
     print(f"\n✓ Image saved to: {output_full_path}")
     print(f"  File size: {output_full_path.stat().st_size / 1024 / 1024:.2f} MB")
     